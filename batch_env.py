@@ -0,0 +1,255 @@
+import numpy as np
+
+from flappy_bird import SCREEN_WIDTH, SCREEN_HEIGHT
+
+# Physics constants, mirroring the defaults in Bird, Pipe and Game
+BIRD_X = 100
+BIRD_START_Y = SCREEN_HEIGHT // 2
+BIRD_WIDTH = 45
+BIRD_HEIGHT = 32
+GRAVITY = 0.6
+JUMP_STRENGTH = -11
+MAGNET_PULL = 1.1
+GROUND_Y = SCREEN_HEIGHT - 50
+
+PIPE_WIDTH = 80
+PIPE_GAP = 200
+PIPE_CAP_HEIGHT = 20
+PIPE_SPEED = 3
+PIPE_MIN_TOP = 100
+PIPE_MAX_TOP = SCREEN_HEIGHT - 150
+PIPE_SPACING = 400
+
+POWER_UP_SIZE = 30
+POWER_UP_SPAWN_X = SCREEN_WIDTH + 50
+POWER_UP_MIN_Y = 150
+POWER_UP_MAX_Y = SCREEN_HEIGHT - 250
+POWER_UP_ATTEMPTS = 50
+
+# Power-up types, same order as Game.update picks them
+SHIELD, MAGNET, DOUBLE = 0, 1, 2
+POWER_UP_DURATIONS = np.array([600, 1200, 1800])
+
+# Slots per game, more than a game can ever have alive at once
+MAX_PIPES = 4
+MAX_POWER_UPS = 3
+
+
+def round_rect_coord(values):
+    """Round like assigning a float to a pygame.Rect attribute (half away from zero)"""
+    return (np.sign(values) * np.floor(np.abs(values) + 0.5)).astype(np.int64)
+
+
+class BatchEnv:
+    """N independent games stepped together with one vectorized update.
+
+    Every game keeps its bird, pipes and power-ups in NumPy arrays and follows
+    Bird.update, Pipe.update, Pipe.get_collision_rects and the power-up rules
+    of Game.update exactly. Games that end are reset automatically, their final
+    score and length are left in episode_scores/episode_lengths for that step.
+    """
+
+    def __init__(self, num_games, seed=None):
+        self.num_games = num_games
+        self.rng = np.random.default_rng(seed)
+        n = num_games
+
+        # Bird
+        self.bird_y = np.zeros(n)
+        self.bird_velocity = np.zeros(n)
+        self.bird_rect_y = np.zeros(n, dtype=np.int64)
+        self.shield_timer = np.zeros(n, dtype=np.int64)
+        self.magnet_timer = np.zeros(n, dtype=np.int64)
+        self.double_points_timer = np.zeros(n, dtype=np.int64)
+
+        # Pipes, one row of slots per game
+        self.pipe_x = np.zeros((n, MAX_PIPES), dtype=np.int64)
+        self.pipe_top = np.zeros((n, MAX_PIPES), dtype=np.int64)
+        self.pipe_bottom = np.zeros((n, MAX_PIPES), dtype=np.int64)
+        self.pipe_active = np.zeros((n, MAX_PIPES), dtype=bool)
+        self.pipe_scored = np.zeros((n, MAX_PIPES), dtype=bool)
+        self.last_pipe_x = np.zeros(n, dtype=np.int64)
+
+        # Power-ups, spawn order is kept so removal matches list iteration
+        self.power_up_x = np.zeros((n, MAX_POWER_UPS), dtype=np.int64)
+        self.power_up_y = np.zeros((n, MAX_POWER_UPS), dtype=np.int64)
+        self.power_up_type = np.zeros((n, MAX_POWER_UPS), dtype=np.int64)
+        self.power_up_active = np.zeros((n, MAX_POWER_UPS), dtype=bool)
+        self.power_up_order = np.zeros((n, MAX_POWER_UPS), dtype=np.int64)
+        self.power_up_spawn_timer = np.zeros(n, dtype=np.int64)
+        self.power_up_count = np.zeros(n, dtype=np.int64)
+
+        self.score = np.zeros(n, dtype=np.int64)
+        self.steps = np.zeros(n, dtype=np.int64)
+        self.episode_scores = np.zeros(n, dtype=np.int64)
+        self.episode_lengths = np.zeros(n, dtype=np.int64)
+
+        self.reset()
+
+    def reset(self, mask=None):
+        """Reset all games, or only the games selected by a boolean mask"""
+        if mask is None:
+            mask = np.ones(self.num_games, dtype=bool)
+        n = int(mask.sum())
+        if n == 0:
+            return
+
+        self.bird_y[mask] = BIRD_START_Y
+        self.bird_velocity[mask] = 0
+        self.bird_rect_y[mask] = BIRD_START_Y
+        self.shield_timer[mask] = 0
+        self.magnet_timer[mask] = 0
+        self.double_points_timer[mask] = 0
+
+        start_x = SCREEN_WIDTH + np.arange(MAX_PIPES) * PIPE_SPACING
+        top = self.rng.integers(PIPE_MIN_TOP, PIPE_MAX_TOP + 1, size=(n, MAX_PIPES))
+        self.pipe_x[mask] = start_x
+        self.pipe_top[mask] = top
+        self.pipe_bottom[mask] = top + PIPE_GAP
+        active = np.zeros(MAX_PIPES, dtype=bool)
+        active[:3] = True
+        self.pipe_active[mask] = active
+        self.pipe_scored[mask] = False
+        self.last_pipe_x[mask] = SCREEN_WIDTH + 2 * PIPE_SPACING
+
+        self.power_up_active[mask] = False
+        self.power_up_spawn_timer[mask] = 0
+        self.power_up_count[mask] = 0
+
+        self.score[mask] = 0
+        self.steps[mask] = 0
+
+    def step(self, actions):
+        """Advance every game one tick, returns (rewards, dones).
+
+        actions is a boolean array, True makes that game's bird jump.
+        """
+        actions = np.asarray(actions, dtype=bool)
+        old_score = self.score.copy()
+
+        self.bird_velocity[actions] = JUMP_STRENGTH
+
+        self._spawn_power_ups()
+        self._update_power_ups()
+        dead = self._update_bird()
+        dead |= self._update_pipes()
+        self._spawn_pipes()
+
+        self.steps += 1
+        rewards = self.score - old_score
+
+        self.episode_scores[dead] = self.score[dead]
+        self.episode_lengths[dead] = self.steps[dead]
+        self.reset(dead)
+        return rewards, dead
+
+    def _spawn_power_ups(self):
+        self.power_up_spawn_timer += 1
+        chance = self.rng.random(self.num_games) < 0.01
+        games = np.flatnonzero((self.power_up_spawn_timer > 180) & chance)
+        if len(games) == 0:
+            return
+
+        # Rejection sampling of all attempts at once, first safe attempt wins
+        test_y = self.rng.integers(POWER_UP_MIN_Y, POWER_UP_MAX_Y + 1, size=(len(games), POWER_UP_ATTEMPTS))
+        near = self.pipe_active[games] & (np.abs(self.pipe_x[games] - POWER_UP_SPAWN_X) < 200)
+        in_pipe = ((test_y[:, :, None] < self.pipe_top[games][:, None, :]) |
+                   (test_y[:, :, None] > self.pipe_bottom[games][:, None, :]))
+        safe = ~(in_pipe & near[:, None, :]).any(axis=2)
+        found = safe.any(axis=1)
+        free = ~self.power_up_active[games]
+        found &= free.any(axis=1)
+
+        games = games[found]
+        safe_y = test_y[found, safe[found].argmax(axis=1)]
+        slot = free[found].argmax(axis=1)
+
+        self.power_up_x[games, slot] = POWER_UP_SPAWN_X
+        self.power_up_y[games, slot] = safe_y
+        self.power_up_type[games, slot] = self.rng.integers(0, 3, size=len(games))
+        self.power_up_active[games, slot] = True
+        self.power_up_order[games, slot] = self.power_up_count[games]
+        self.power_up_count[games] += 1
+        self.power_up_spawn_timer[games] = 0
+
+    def _update_power_ups(self):
+        active = self.power_up_active
+        self.power_up_x -= PIPE_SPEED * active
+
+        # Collision against the bird rect of the previous tick
+        rect_y = self.bird_rect_y[:, None]
+        hit = (active &
+               (BIRD_X < self.power_up_x + POWER_UP_SIZE) & (self.power_up_x < BIRD_X + BIRD_WIDTH) &
+               (rect_y < self.power_up_y + POWER_UP_SIZE) & (self.power_up_y < rect_y + BIRD_HEIGHT))
+
+        games, slots = np.nonzero(hit)
+        if len(games):
+            duration = POWER_UP_DURATIONS[self.power_up_type[games, slots]]
+            kind = self.power_up_type[games, slots]
+            self.shield_timer[games[kind == SHIELD]] = duration[kind == SHIELD]
+            self.magnet_timer[games[kind == MAGNET]] = duration[kind == MAGNET]
+            self.double_points_timer[games[kind == DOUBLE]] = duration[kind == DOUBLE]
+
+            # Removing from the list while iterating skips the next power-up's move
+            later = active[games] & (self.power_up_order[games] > self.power_up_order[games, slots][:, None])
+            skipped = np.where(later, self.power_up_order[games], np.iinfo(np.int64).max).argmin(axis=1)
+            has_later = later.any(axis=1)
+            self.power_up_x[games[has_later], skipped[has_later]] += PIPE_SPEED
+            self.power_up_active[games, slots] = False
+
+        self.power_up_active &= self.power_up_x > -50
+
+    def _update_bird(self):
+        for timer in (self.shield_timer, self.magnet_timer, self.double_points_timer):
+            timer -= timer > 0
+
+        self.bird_velocity += GRAVITY
+        self.bird_y += self.bird_velocity
+        magnet = self.magnet_timer > 0
+        self.bird_velocity[magnet] *= MAGNET_PULL
+        self.bird_rect_y = round_rect_coord(self.bird_y)
+
+        return (self.bird_y < 0) | (self.bird_y + BIRD_HEIGHT > GROUND_Y)
+
+    def _update_pipes(self):
+        active = self.pipe_active
+        self.pipe_x -= PIPE_SPEED * active
+        self.last_pipe_x -= PIPE_SPEED
+
+        x = self.pipe_x
+        top = self.pipe_top
+        bottom = self.pipe_bottom
+        rect_y = self.bird_rect_y[:, None]
+        rect_bottom = rect_y + BIRD_HEIGHT
+
+        # Same four rects as Pipe.get_collision_rects
+        body_x = (BIRD_X < x + PIPE_WIDTH) & (x < BIRD_X + BIRD_WIDTH)
+        cap_x = (BIRD_X < x - 5 + PIPE_WIDTH + 10) & (x - 5 < BIRD_X + BIRD_WIDTH)
+        top_body = body_x & (rect_y < top) & (0 < rect_bottom)
+        bottom_body = body_x & (rect_y < SCREEN_HEIGHT) & (bottom < rect_bottom)
+        top_cap = cap_x & (rect_y < top) & (top - PIPE_CAP_HEIGHT < rect_bottom)
+        bottom_cap = cap_x & (rect_y < bottom + PIPE_CAP_HEIGHT) & (bottom < rect_bottom)
+        hit = active & (top_body | bottom_body | top_cap | bottom_cap)
+        dead = hit.any(axis=1) & (self.shield_timer == 0)
+
+        passed = active & ~self.pipe_scored & (x + PIPE_WIDTH < BIRD_X)
+        points = np.where(self.double_points_timer > 0, 2, 1)
+        self.score += passed.sum(axis=1) * points
+        self.pipe_scored |= passed
+
+        self.pipe_active &= x + PIPE_WIDTH > 0
+        return dead
+
+    def _spawn_pipes(self):
+        games = np.flatnonzero(self.last_pipe_x < SCREEN_WIDTH - PIPE_SPACING)
+        if len(games) == 0:
+            return
+
+        slot = (~self.pipe_active[games]).argmax(axis=1)
+        top = self.rng.integers(PIPE_MIN_TOP, PIPE_MAX_TOP + 1, size=len(games))
+        self.pipe_x[games, slot] = SCREEN_WIDTH
+        self.pipe_top[games, slot] = top
+        self.pipe_bottom[games, slot] = top + PIPE_GAP
+        self.pipe_active[games, slot] = True
+        self.pipe_scored[games, slot] = False
+        self.last_pipe_x[games] = SCREEN_WIDTH
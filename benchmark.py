@@ -0,0 +1,163 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+# Offscreen rendering and no banner on stdout, must be set before pygame is imported
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import numpy as np
+import pygame
+
+from flappy_bird import Game
+from profiler import FrameProfiler
+from rollout import gap_policy
+
+# Frames to keep rendering the game over screen before starting the next episode
+GAME_OVER_FRAMES = 60
+
+
+def percentiles(samples_ns):
+    """p50/p95/p99 and mean of a list of nanosecond timings, in milliseconds"""
+    if not samples_ns:
+        return {'p50_ms': 0.0, 'p95_ms': 0.0, 'p99_ms': 0.0, 'mean_ms': 0.0, 'samples': 0}
+    ms = np.asarray(samples_ns) / 1e6
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {'p50_ms': float(p50), 'p95_ms': float(p95), 'p99_ms': float(p99),
+            'mean_ms': float(ms.mean()), 'samples': len(samples_ns)}
+
+
+def peak_rss_bytes():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def scripted_frames(game, frames, seed):
+    """Yield once per frame of seeded episodes played by gap_policy, game over screens included"""
+    obs = game.reset(seed)
+    over_frames = 0
+    for _ in range(frames):
+        if game.game_over:
+            over_frames += 1
+            if over_frames > GAME_OVER_FRAMES:
+                seed += 1
+                obs = game.reset(seed)
+                over_frames = 0
+        yield obs
+        if game.game_over:
+            game.update()
+        else:
+            obs, reward, done = game.step(gap_policy(obs))
+
+
+def bench_headless(episodes, seed, max_steps):
+    game = Game(headless=True)
+    steps = 0
+    start = time.perf_counter()
+    for episode in range(episodes):
+        obs = game.reset(seed + episode)
+        done = False
+        length = 0
+        while not done and length < max_steps:
+            obs, reward, done = game.step(gap_policy(obs))
+            length += 1
+        steps += length
+    elapsed = time.perf_counter() - start
+    return {'episodes': episodes, 'steps': steps, 'seconds': elapsed, 'steps_per_sec': steps / elapsed}
+
+
+def bench_render(frames, seed):
+    # A window as long as the run keeps every sample
+    profiler = FrameProfiler(window=frames)
+    game = Game(high_score_file=None, profiler=profiler)
+
+    start = time.perf_counter()
+    for _ in scripted_frames(game, frames, seed):
+        game.draw()
+    elapsed = time.perf_counter() - start
+
+    stages = {group: {name: percentiles(times.values()) for name, times in group_times.items()}
+              for group, group_times in profiler.groups.items()}
+    return {
+        'frames': frames,
+        'fps': frames / elapsed,
+        'frame': stages['draw'].pop('total'),
+        'update': stages['update'].pop('total'),
+        'update_stages': stages['update'],
+        'draw_stages': stages['draw'],
+    }
+
+
+def bench_allocations(frames, seed):
+    """Python heap growth and transient peak per rendered frame, measured with tracemalloc"""
+    game = Game(high_score_file=None)
+    blocks = []
+    transient = []
+    tracemalloc.start()
+    try:
+        for _ in scripted_frames(game, frames, seed):
+            before_blocks = sys.getallocatedblocks()
+            before, _peak = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            game.draw()
+            current, peak = tracemalloc.get_traced_memory()
+            transient.append(peak - before)
+            blocks.append(sys.getallocatedblocks() - before_blocks)
+    finally:
+        tracemalloc.stop()
+    return {
+        'frames': frames,
+        'transient_bytes_per_frame': {'p50': float(np.percentile(transient, 50)),
+                                      'p99': float(np.percentile(transient, 99)),
+                                      'max': int(max(transient))},
+        'allocated_blocks_delta_per_frame': float(np.mean(blocks)),
+    }
+
+
+def run(episodes=200, frames=3000, seed=0, max_steps=20000, skip_render=False):
+    results = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'config': {'episodes': episodes, 'frames': frames, 'seed': seed, 'max_steps': max_steps},
+        'headless': bench_headless(episodes, seed, max_steps),
+    }
+    if not skip_render:
+        results['render'] = bench_render(frames, seed)
+        results['allocations'] = bench_allocations(min(frames, 1000), seed)
+    results['peak_rss_bytes'] = peak_rss_bytes()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark headless stepping and offscreen rendering")
+    parser.add_argument('--episodes', type=int, default=200, help="headless episodes to play")
+    parser.add_argument('--frames', type=int, default=3000, help="frames to render offscreen")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-steps', type=int, default=20000, help="step limit per headless episode")
+    parser.add_argument('--headless-only', action='store_true', help="skip the render benchmarks")
+    parser.add_argument('--output', '-o', help="write the JSON results to this file")
+    args = parser.parse_args()
+
+    results = run(args.episodes, args.frames, args.seed, args.max_steps, args.headless_only)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,32 @@
-import pygame
+import os
 import random
 import sys
 import math
+from array import array
+from collections import OrderedDict
+
+# Importing the game should print nothing, set before pygame is imported
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import numpy as np
+import pygame
 
-# Initialize Pygame
-pygame.init()
+from profiler import FrameProfiler
+from scores import PLAYER, open_score_store
+
+# Nothing is initialized on import: headless games only need pygame.Rect, the
+# display and font modules are initialized on first use by init_display and
+# get_font, and no other pygame module is ever used
 
 # Constants
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
 FPS = 60
+# Simulation ticks per second, every timer and speed counted in ticks assumes it
+SIM_RATE = 60
+SIM_DT = 1 / SIM_RATE
+# Longest frame fed to the simulation, so a stall does not turn into a burst of ticks
+MAX_FRAME_TIME = 0.25
 
 # Colors
 SKY_BLUE = (135, 206, 235)
@@ -29,37 +46,119 @@ PURPLE = (255, 0, 255)
 GOLD = (255, 215, 0)
 BLUE = (0, 100, 255)
 
+# Positions the bird's motion trail remembers
+TRAIL_LENGTH = 15
+
+# Bird sprites are pre-rotated in steps of BIRD_ANGLE_STEP degrees up to
+# BIRD_MAX_ANGLE either way, with one wing frame per pixel of flap offset
+BIRD_ANGLE_STEP = 5
+BIRD_MAX_ANGLE = 45
+BIRD_FLAP_RANGE = 5
+
+# Observation layout returned by Game.reset/Game.step
+# bird y, bird velocity, next pipe x, top height, bottom y, shield, magnet and 2x timers
+OBS_SIZE = 8
+
 # Particle system
-class Particle:
-    def __init__(self, x, y, color, vx=0, vy=0, lifetime=30):
-        self.x = x
-        self.y = y
-        self.vx = vx
-        self.vy = vy
-        self.color = color
-        self.lifetime = lifetime
-        self.max_lifetime = lifetime
-        self.size = random.uniform(2, 5)
+class CircleSpriteCache:
+    """Pre-rendered alpha circles shared by particles and glows, keyed by color, radius and alpha"""
+    def __init__(self):
+        self.sprites = {}
+    
+    def get(self, color, radius, alpha):
+        key = (color, radius, alpha)
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            sprite = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+            pygame.draw.circle(sprite, (*color, alpha), (radius, radius), radius)
+            self.sprites[key] = sprite
+        return sprite
+
+class ParticleSystem:
+    """Particles kept in preallocated NumPy arrays and updated in one vectorized step"""
+    # Particle alpha is rounded up to steps of this size to bound the sprite cache
+    ALPHA_STEP = 16
+    
+    def __init__(self, capacity=512, seed=None):
+        self.capacity = capacity
+        self.count = 0
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.vx = np.zeros(capacity)
+        self.vy = np.zeros(capacity)
+        self.lifetime = np.zeros(capacity)
+        self.max_lifetime = np.ones(capacity)
+        self.size = np.zeros(capacity)
+        self.color = np.zeros(capacity, dtype=np.int64)
+        self.colors = []
+        self.rng = np.random.default_rng(seed)
+    
+    def clear(self, seed=None):
+        self.count = 0
+        self.rng = np.random.default_rng(seed)
+    
+    def emit(self, x, y, color, count, vx_range, vy_range, lifetime_range):
+        """Spawn count particles at (x, y), lifetime_range is inclusive like randint"""
+        count = min(count, self.capacity - self.count)
+        if count <= 0:
+            return
+        if color not in self.colors:
+            self.colors.append(color)
+        
+        new = slice(self.count, self.count + count)
+        self.x[new] = x
+        self.y[new] = y
+        self.vx[new] = self.rng.uniform(*vx_range, count)
+        self.vy[new] = self.rng.uniform(*vy_range, count)
+        self.lifetime[new] = self.rng.integers(lifetime_range[0], lifetime_range[1] + 1, count)
+        self.max_lifetime[new] = self.lifetime[new]
+        self.size[new] = self.rng.uniform(2, 5, count)
+        self.color[new] = self.colors.index(color)
+        self.count += count
     
     def update(self):
-        self.x += self.vx
-        self.y += self.vy
-        self.vy += 0.2
-        self.vx *= 0.95
-        self.lifetime -= 1
-        return self.lifetime > 0
+        n = self.count
+        if n == 0:
+            return
+        self.x[:n] += self.vx[:n]
+        self.y[:n] += self.vy[:n]
+        self.vy[:n] += 0.2
+        self.vx[:n] *= 0.95
+        self.lifetime[:n] -= 1
+        
+        # Compact the survivors to the front of the arrays
+        alive = self.lifetime[:n] > 0
+        if not alive.all():
+            self.count = int(alive.sum())
+            for values in (self.x, self.y, self.vx, self.vy, self.lifetime, self.max_lifetime, self.size, self.color):
+                values[:self.count] = values[:n][alive]
     
-    def draw(self, screen):
-        alpha = int(255 * (self.lifetime / self.max_lifetime))
-        if alpha > 0:
-            try:
-                surface = pygame.Surface((int(self.size * 2), int(self.size * 2)), pygame.SRCALPHA)
-                pygame.draw.circle(surface, (*self.color, alpha), (int(self.size), int(self.size)), int(self.size))
-                screen.blit(surface, (int(self.x - self.size), int(self.y - self.size)))
-            except:
-                pygame.draw.circle(screen, self.color, (int(self.x), int(self.y)), int(self.size))
+    def draw(self, screen, circles):
+        """Draw all particles, returns their bounding rect or None"""
+        n = self.count
+        if n == 0:
+            return None
+        alpha = (255 * self.lifetime[:n] / self.max_lifetime[:n]).astype(np.int64)
+        alpha = np.minimum(255, -(-alpha // self.ALPHA_STEP) * self.ALPHA_STEP)
+        radius = self.size[:n].astype(np.int64)
+        left = (self.x[:n] - self.size[:n]).astype(np.int64)
+        top = (self.y[:n] - self.size[:n]).astype(np.int64)
+        
+        colors = self.colors
+        screen.blits([(circles.get(colors[c], r, a), (px, py))
+                      for c, r, a, px, py in zip(self.color[:n].tolist(), radius.tolist(), alpha.tolist(),
+                                                 left.tolist(), top.tolist())
+                      if a > 0], doreturn=False)
+        
+        right = int((left + 2 * radius).max())
+        bottom = int((top + 2 * radius).max())
+        min_left = int(left.min())
+        min_top = int(top.min())
+        return pygame.Rect(min_left, min_top, right - min_left, bottom - min_top)
 
 class GlowEffect:
+    __slots__ = ('x', 'y', 'radius', 'color', 'intensity', 'lifetime')
+    
     def __init__(self, x, y, radius, color, intensity=10):
         self.x = x
         self.y = y
@@ -72,28 +171,34 @@ class GlowEffect:
         self.lifetime -= 0.5
         return self.lifetime > 0
     
-    def draw(self, screen):
+    def draw(self, screen, circles):
+        """Draw the glow rings, returns the outermost ring's rect or None"""
+        rect = None
         if self.lifetime > 0:
             alpha_ratio = self.lifetime / self.intensity
             current_radius = int(self.radius * alpha_ratio)
             if current_radius > 0:
-                for i in range(5):
-                    r = current_radius + i * 5
-                    alpha = int(30 * alpha_ratio)
-                    if r > 0 and alpha > 0:
-                        try:
-                            surface = pygame.Surface((r * 2, r * 2), pygame.SRCALPHA)
-                            pygame.draw.circle(surface, (*self.color, alpha), (r, r), r)
-                            screen.blit(surface, (self.x - r, self.y - r))
-                        except:
-                            pass
+                alpha = int(30 * alpha_ratio)
+                if alpha > 0:
+                    for i in range(5):
+                        r = current_radius + i * 5
+                        rect = screen.blit(circles.get(self.color, r, alpha), (self.x - r, self.y - r))
+        return rect
 
 class PowerUp:
+    __slots__ = ('x', 'y', 'prev_x', 'type', 'rect', 'animation', 'color')
+    
     def __init__(self, x, y, power_type):
+        self.rect = pygame.Rect(x, y, 30, 30)
+        self.place(x, y, power_type)
+    
+    def place(self, x, y, power_type):
+        """Set the power-up up as new at (x, y), so pooled ones can be reused"""
         self.x = x
         self.y = y
+        self.prev_x = x
         self.type = power_type  # 'shield', 'magnet', 'double'
-        self.rect = pygame.Rect(x, y, 30, 30)
+        self.rect.topleft = (x, y)
         self.animation = 0
         
         if power_type == 'shield':
@@ -108,10 +213,12 @@ class PowerUp:
     def update(self):
         self.animation += 0.2
     
-    def draw(self, screen):
+    def draw(self, screen, alpha=1.0):
+        # Interpolated between the last two ticks
+        x = int(self.prev_x + (self.x - self.prev_x) * alpha)
         size = 15 + int(math.sin(self.animation) * 3)
-        pygame.draw.circle(screen, self.color, (int(self.x), int(self.y)), size)
-        pygame.draw.circle(screen, WHITE, (int(self.x), int(self.y)), size, 2)
+        rect = pygame.draw.circle(screen, self.color, (x, int(self.y)), size)
+        pygame.draw.circle(screen, WHITE, (x, int(self.y)), size, 2)
         
         # Icon based on type
         if self.type == 'shield':
@@ -126,52 +233,165 @@ class PowerUp:
         elif self.type == 'double':
             # 2x icon
             pass
+        return rect
 
 class Cloud:
-    def __init__(self, x, y):
+    __slots__ = ('x', 'y', 'rng', 'size', 'speed', 'z', 'puffs', 'surface', 'offset')
+    
+    def __init__(self, x, y, rng=random):
         self.x = x
         self.y = y
-        self.size = random.uniform(0.7, 1.3)
-        self.speed = random.uniform(0.5, 1.5)
-        self.z = random.uniform(0.5, 2.0)
+        self.rng = rng
+        self.size = rng.uniform(0.7, 1.3)
+        self.speed = rng.uniform(0.5, 1.5)
+        self.z = rng.uniform(0.5, 2.0)
         self.puffs = []
         self.generate_puffs()
+        self.render()
     
     def generate_puffs(self):
         for i in range(8):
             self.puffs.append({
-                'x': random.uniform(-40, 40) * self.size,
-                'y': random.uniform(-20, 20) * self.size,
-                'size': random.uniform(15, 40) * self.size * self.z,
-                'opacity': random.uniform(0.6, 0.95)
+                'x': self.rng.uniform(-40, 40) * self.size,
+                'y': self.rng.uniform(-20, 20) * self.size,
+                'size': self.rng.uniform(15, 40) * self.size * self.z,
+                'opacity': self.rng.uniform(0.6, 0.95)
             })
     
+    def render(self):
+        """Composite all puffs into one surface, back to front"""
+        puffs = [(int(p['x']), int(p['y']), int(p['size']), p['opacity']) for p in self.puffs if int(p['size']) > 0]
+        left = min(x - size for x, y, size, opacity in puffs)
+        top = min(y - size for x, y, size, opacity in puffs)
+        right = max(x + size for x, y, size, opacity in puffs)
+        bottom = max(y + size for x, y, size, opacity in puffs)
+        
+        self.surface = pygame.Surface((right - left, bottom - top), pygame.SRCALPHA)
+        for x, y, size, opacity in sorted(puffs, key=lambda p: p[1]):
+            puff = pygame.Surface((size * 2, size * 2), pygame.SRCALPHA)
+            pygame.draw.circle(puff, (*CLOUD_WHITE, int(255 * opacity)), (size, size), size)
+            self.surface.blit(puff, (x - size - left, y - size - top))
+        if pygame.display.get_surface() is not None:
+            self.surface = self.surface.convert_alpha()
+        self.offset = (left, top)
+    
     def update(self):
+        """Move the cloud, returns True when it wrapped around and got a new depth"""
         self.x -= self.speed * self.z
         if self.x < -300:
             self.x = SCREEN_WIDTH + 150
-            self.y = random.randint(50, 250)
-            self.z = random.uniform(0.5, 2.0)
+            self.y = self.rng.randint(50, 250)
+            self.z = self.rng.uniform(0.5, 2.0)
+            return True
+        return False
     
     def draw(self, screen):
-        for puff in sorted(self.puffs, key=lambda p: p['y']):
-            x = int(self.x + puff['x'])
-            y = int(self.y + puff['y'])
-            size = int(puff['size'])
-            opacity = puff['opacity']
-            
-            try:
+        return screen.blit(self.surface, (int(self.x) + self.offset[0], int(self.y) + self.offset[1]))
+
+# Trail dot sprites per trail length, shared by every bird
+_trail_sprites = {}
+
+def get_trail_sprites(length):
+    """Dot sprites for a trail of up to length positions.
+    
+    sprites[n][i] is the dot for the i-th oldest of n remembered positions,
+    or None where that dot is not drawn.
+    """
+    sprites = _trail_sprites.get(length)
+    if sprites is None:
+        sprites = _trail_sprites[length] = [[None] * max(n, 1) for n in range(length + 1)]
+        for n in range(3, length + 1):
+            for i in range(1, n - 1):
+                alpha = i * 15
+                size = int(8 * (i / n))
+                if alpha >= 200 or size <= 0:
+                    continue
                 surface = pygame.Surface((size * 2, size * 2), pygame.SRCALPHA)
-                color = (*CLOUD_WHITE, int(255 * opacity))
-                pygame.draw.circle(surface, color, (size, size), size)
-                screen.blit(surface, (x - size, y - size))
-            except:
-                pass
+                pygame.draw.circle(surface, (255, 215, 0, alpha // 2), (size, size), size)
+                sprites[n][i] = (surface, size)
+    return sprites
+
+def draw_bird_shape(surface, x, y, flap_offset):
+    """Draw the bird's body with its top left at (x, y) and the wing tip moved by flap_offset"""
+    wing_points = [
+        (x + 20, y + 15),
+        (x + 35, y + 10 + flap_offset),
+        (x + 25, y + 25),
+    ]
+    pygame.draw.polygon(surface, (220, 200, 0), wing_points)
+    pygame.draw.ellipse(surface, YELLOW, (x, y, 45, 32))
+    
+    # Head
+    pygame.draw.ellipse(surface, YELLOW, (x + 10, y + 3, 22, 20))
+    
+    # Eye
+    eye_x = int(x + 18)
+    eye_y = int(y + 10)
+    pygame.draw.circle(surface, WHITE, (eye_x, eye_y), 8)
+    pygame.draw.circle(surface, BLACK, (eye_x + 2, eye_y), 4)
+    pygame.draw.circle(surface, WHITE, (eye_x + 3, eye_y - 1), 2)
+    
+    # Beak
+    beak_points = [(x + 35, y + 13), (x + 48, y + 15), (x + 35, y + 19)]
+    pygame.draw.polygon(surface, ORANGE, beak_points)
+
+class BirdAtlas:
+    """Every wing frame of the bird at every quantized angle, drawn once.
+    
+    Sprites are centered on the bird's center, get() returns the sprite with
+    the offset from the bird's center to its top left corner.
+    """
+    def __init__(self):
+        convert = pygame.display.get_surface() is not None
+        # Square canvas around the bird's center, roomy enough for any rotation
+        size = 64
+        left = size // 2 - 45 // 2
+        top = size // 2 - 32 // 2
+        angles = range(-BIRD_MAX_ANGLE, BIRD_MAX_ANGLE + 1, BIRD_ANGLE_STEP)
+        self.frames = []
+        for flap_offset in range(-BIRD_FLAP_RANGE, BIRD_FLAP_RANGE + 1):
+            base = pygame.Surface((size, size), pygame.SRCALPHA)
+            draw_bird_shape(base, left, top, flap_offset)
+            sprites = []
+            for angle in angles:
+                sprite = pygame.transform.rotate(base, angle)
+                if convert:
+                    sprite = sprite.convert_alpha()
+                sprites.append((sprite, (-(sprite.get_width() // 2), -(sprite.get_height() // 2))))
+            self.frames.append(sprites)
+        
+        shield_radius = 45 + 20
+        self.shield = pygame.Surface((shield_radius * 2 + 1, shield_radius * 2 + 1), pygame.SRCALPHA)
+        pygame.draw.circle(self.shield, CYAN, (shield_radius, shield_radius), shield_radius, 3)
+        if convert:
+            self.shield = self.shield.convert_alpha()
+        self.shield_offset = (-shield_radius, -shield_radius)
+    
+    def get(self, wing_flap, angle):
+        """Sprite and top left offset for a wing_flap phase and an angle in degrees"""
+        frame = round(math.sin(wing_flap) * BIRD_FLAP_RANGE) + BIRD_FLAP_RANGE
+        index = round((max(-BIRD_MAX_ANGLE, min(BIRD_MAX_ANGLE, angle)) + BIRD_MAX_ANGLE) / BIRD_ANGLE_STEP)
+        return self.frames[frame][index]
+
+_bird_atlas = None
+
+def get_bird_atlas():
+    """The BirdAtlas shared by every bird, built on first use"""
+    global _bird_atlas
+    if _bird_atlas is None:
+        _bird_atlas = BirdAtlas()
+    return _bird_atlas
 
 class Bird:
-    def __init__(self, x, y):
+    __slots__ = ('x', 'y', 'prev_y', 'velocity', 'gravity', 'jump_strength', 'width', 'height', 'rect',
+                 'angle', 'wing_flap', 'trail_length', 'trail_x', 'trail_y', 'trail_head', 'trail_count',
+                 'shield_active', 'shield_timer', 'slow_motion_active', 'slow_motion_timer',
+                 'magnet_active', 'magnet_timer', 'double_points_active', 'double_points_timer')
+    
+    def __init__(self, x, y, trail_length=TRAIL_LENGTH):
         self.x = x
         self.y = y
+        self.prev_y = y
         self.velocity = 0
         self.gravity = 0.6
         self.jump_strength = -11
@@ -180,8 +400,12 @@ class Bird:
         self.rect = pygame.Rect(x, y, self.width, self.height)
         self.angle = 0
         self.wing_flap = 0
-        self.trail = []
-        self.last_positions = []
+        # Ring buffer of the last trail_length centers, 0 turns the trail off
+        self.trail_length = trail_length
+        self.trail_x = array('i', bytes(4 * trail_length))
+        self.trail_y = array('i', bytes(4 * trail_length))
+        self.trail_head = 0
+        self.trail_count = 0
         
         # Power-ups
         self.shield_active = False
@@ -198,6 +422,8 @@ class Bird:
         self.wing_flap = 10
     
     def update(self):
+        self.prev_y = self.y
+        
         # Update power-up timers
         if self.shield_active:
             self.shield_timer -= 1
@@ -228,9 +454,13 @@ class Bird:
         if self.magnet_active:
             self.velocity *= 1.1  # Slight upward pull
         
-        self.last_positions.append((int(self.x + self.width // 2), int(self.y + self.height // 2)))
-        if len(self.last_positions) > 15:
-            self.last_positions.pop(0)
+        if self.trail_length:
+            head = self.trail_head
+            self.trail_x[head] = int(self.x + self.width // 2)
+            self.trail_y[head] = int(self.y + self.height // 2)
+            self.trail_head = (head + 1) % self.trail_length
+            if self.trail_count < self.trail_length:
+                self.trail_count += 1
         
         self.angle = -self.velocity * 3
         self.angle = max(-45, min(45, self.angle))
@@ -238,150 +468,379 @@ class Bird:
         self.rect.y = self.y
         self.wing_flap = max(0, self.wing_flap - 0.5)
     
-    def draw(self, screen):
+    def draw(self, screen, alpha=1.0):
+        """Draw the bird between its last two ticks, returns the rect covering everything drawn"""
+        atlas = get_bird_atlas()
+        y = self.prev_y + (self.y - self.prev_y) * alpha
+        center_x = int(self.x + self.width // 2)
+        center_y = int(y + self.height // 2)
+        rects = []
         # Shield effect
         if self.shield_active:
-            shield_radius = self.width + 20
-            shield_color = CYAN if int(self.shield_timer / 5) % 2 == 0 else (0, 255, 255)
-            pygame.draw.circle(screen, shield_color, 
-                             (int(self.x + self.width // 2), int(self.y + self.height // 2)), 
-                             shield_radius, 3)
-        
-        # Motion blur trail
-        if len(self.last_positions) > 2:
-            for i, pos in enumerate(self.last_positions[:-1]):
-                alpha = i * 15
-                if alpha < 200 and i > 0:
-                    try:
-                        size = int(8 * (i / len(self.last_positions)))
-                        surface = pygame.Surface((size * 2, size * 2), pygame.SRCALPHA)
-                        pygame.draw.circle(surface, (255, 215, 0, alpha // 2), (size, size), size)
-                        screen.blit(surface, (pos[0] - size, pos[1] - size))
-                    except:
-                        pass
-        
-        # Wing animation
-        flap_offset = math.sin(self.wing_flap) * 5
-        wing_points = [
-            (self.x + 20, self.y + 15),
-            (self.x + 35, self.y + 10 + flap_offset),
-            (self.x + 25, self.y + 25),
-        ]
-        
-        pygame.draw.polygon(screen, (220, 200, 0), wing_points)
-        pygame.draw.ellipse(screen, YELLOW, self.rect)
-        
-        # Head
-        head_rect = pygame.Rect(self.x + 10, self.y + 3, 22, 20)
-        pygame.draw.ellipse(screen, YELLOW, head_rect)
-        
-        # Eye
-        eye_x = int(self.x + 18)
-        eye_y = int(self.y + 10)
-        pygame.draw.circle(screen, WHITE, (eye_x, eye_y), 8)
-        pygame.draw.circle(screen, BLACK, (eye_x + 2, eye_y), 4)
-        pygame.draw.circle(screen, WHITE, (eye_x + 3, eye_y - 1), 2)
-        
-        # Beak
-        beak_points = [(self.x + 35, self.y + 13), (self.x + 48, self.y + 15), (self.x + 35, self.y + 19)]
-        pygame.draw.polygon(screen, ORANGE, beak_points)
+            offset_x, offset_y = atlas.shield_offset
+            rects.append(screen.blit(atlas.shield, (center_x + offset_x, center_y + offset_y)))
+        
+        # Motion blur trail, oldest dot first, the newest position is covered by the bird
+        n = self.trail_count
+        if n > 2:
+            sprites = get_trail_sprites(self.trail_length)[n]
+            length = self.trail_length
+            oldest = self.trail_head - n
+            trail_x = self.trail_x
+            trail_y = self.trail_y
+            dots = []
+            for i in range(1, n - 1):
+                sprite = sprites[i]
+                if sprite is not None:
+                    surface, size = sprite
+                    j = (oldest + i) % length
+                    dots.append((surface, (trail_x[j] - size, trail_y[j] - size)))
+            rects += screen.blits(dots)
+        
+        sprite, (offset_x, offset_y) = atlas.get(self.wing_flap, self.angle)
+        rect = screen.blit(sprite, (center_x + offset_x, center_y + offset_y))
+        return rect.unionall(rects)
 
 class Pipe:
-    def __init__(self, x, gap_height):
+    __slots__ = ('x', 'prev_x', 'width', 'gap', 'top_height', 'bottom_y', 'speed', 'cap_height',
+                 'collision_rects', 'scored')
+    
+    def __init__(self, x, gap_height, rng=random, top_height=None):
         self.x = x
+        self.prev_x = x
         self.width = 80
         self.gap = 200
-        self.top_height = random.randint(100, gap_height)
-        self.bottom_y = self.top_height + self.gap
         self.speed = 3
         self.cap_height = 20
+        # Collision geometry is built once and moved along with the pipe
+        self.collision_rects = [pygame.Rect(0, 0, 0, 0) for _ in range(4)]
+        # A given top_height rebuilds a known pipe without drawing from rng
+        self.place(x, rng.randint(100, gap_height) if top_height is None else top_height)
+    
+    def place(self, x, top_height, gap=None):
+        """Put the pipe at x with its gap below top_height, reusing its collision rects"""
+        self.x = x
+        self.prev_x = x
+        self.scored = False
+        if gap is not None:
+            self.gap = gap
+        self.top_height = top_height
+        self.bottom_y = top_height + self.gap
+        top, bottom, top_cap, bottom_cap = self.collision_rects
+        top.update(x, 0, self.width, top_height)
+        bottom.update(x, self.bottom_y, self.width, SCREEN_HEIGHT - self.bottom_y)
+        top_cap.update(x - 5, top_height - self.cap_height, self.width + 10, self.cap_height)
+        bottom_cap.update(x - 5, self.bottom_y, self.width + 10, self.cap_height)
         
     def update(self):
+        self.prev_x = self.x
         self.x -= self.speed
+        for rect in self.collision_rects:
+            rect.x -= self.speed
     
-    def draw(self, screen):
-        # Top pipe with shading
-        top_rect = pygame.Rect(self.x, 0, self.width, self.top_height)
-        pygame.draw.rect(screen, GREEN, top_rect)
+    def overlaps_x(self, left, right):
+        """Broad phase: does the pipe, caps included, span any of [left, right)"""
+        return self.x - 5 < right and self.x + self.width + 5 > left
+    
+    def draw(self, screen, sprites, alpha=1.0):
+        x = round(self.prev_x + (self.x - self.prev_x) * alpha)
         
-        for i in range(10):
-            shade_color = tuple(max(0, c - i * 8) for c in GREEN)
-            pygame.draw.rect(screen, shade_color, (self.x + i, 0, 8, self.top_height))
+        # Top pipe and cap
+        screen.blit(sprites.pipe_body, (x, 0), (0, 0, self.width, self.top_height))
+        screen.blit(sprites.pipe_cap, (x - 5, self.top_height - self.cap_height))
+        
+        # Bottom pipe and cap
+        screen.blit(sprites.pipe_body, (x, self.bottom_y), (0, 0, self.width, SCREEN_HEIGHT - self.bottom_y))
+        screen.blit(sprites.pipe_cap, (x - 5, self.bottom_y))
+        return pygame.Rect(x - 5, 0, self.width + 10, SCREEN_HEIGHT)
+    
+    def get_collision_rects(self):
+        return self.collision_rects
+
+def init_display():
+    if not pygame.display.get_init():
+        pygame.display.init()
+
+# Fonts are loaded once per process and shared by every game
+_fonts = {}
+
+def get_font(size):
+    font = _fonts.get(size)
+    if font is None:
+        if not pygame.font.get_init():
+            pygame.font.init()
+        font = _fonts[size] = pygame.font.Font(None, size)
+    return font
+
+class TextCache:
+    """LRU cache of rendered text surfaces keyed by font, text and color"""
+    def __init__(self, capacity=128):
+        self.capacity = capacity
+        self.surfaces = OrderedDict()
+    
+    def render(self, font, text, color):
+        key = (font, text, color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+        
+        surface = font.render(text, True, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.capacity:
+            self.surfaces.popitem(last=False)
+        return surface
+
+class SpriteCache:
+    """Pre-rendered sky, ground and pipe surfaces, rebuilt only when the screen size changes"""
+    def __init__(self, width, height, ground_height):
+        self.build(width, height, ground_height)
+    
+    def build(self, width, height, ground_height):
+        self.size = (width, height)
+        ground_y = height - ground_height
         
-        pygame.draw.rect(screen, (100, 180, 100), (self.x, 0, 15, self.top_height))
+        # Sky gradient
+        self.sky = self._surface((width, ground_y))
+        for y in range(ground_y):
+            color_value = min(255, 135 + y // 3)
+            color = (color_value, 206, min(255, 235 + y // 4))
+            pygame.draw.line(self.sky, color, (0, y), (width, y))
         
-        # Top cap
-        cap_top = pygame.Rect(self.x - 5, self.top_height - self.cap_height, self.width + 10, self.cap_height)
-        pygame.draw.rect(screen, DARK_GREEN, cap_top)
+        # Ground with grass blades reaching up to 15px above it, keyed out around them
+        self.grass_height = 16
+        self.ground = self._surface((width, ground_height + self.grass_height))
+        self.ground.fill(PURPLE)
+        self.ground.set_colorkey(PURPLE)
+        top = self.grass_height
+        pygame.draw.rect(self.ground, GRASS_GREEN, (0, top, width, ground_height))
+        rng = random.Random(0)
+        for x in range(0, width, 20):
+            for i in range(3):
+                grass_start_x = x + i * 6
+                pygame.draw.line(self.ground, (100, 200, 100), 
+                               (grass_start_x, top), 
+                               (grass_start_x + rng.randint(-5, 5), top - rng.randint(5, 15)), 2)
+        pygame.draw.line(self.ground, DARK_GREEN, (0, top), (width, top), 3)
         
-        # Bottom pipe
-        bottom_rect = pygame.Rect(self.x, self.bottom_y, self.width, SCREEN_HEIGHT - self.bottom_y)
-        pygame.draw.rect(screen, GREEN, bottom_rect)
+        # Plain ground used on the game over screen, starting one row higher for the line
+        self.ground_plain = self._surface((width, ground_height + 1))
+        self.ground_plain.fill(GRASS_GREEN)
+        pygame.draw.line(self.ground_plain, DARK_GREEN, (0, 1), (width, 1), 3)
         
+        # Pipe body as tall as the screen, blitted partially for each segment
+        pipe_width = 80
+        self.pipe_body = self._surface((pipe_width, height))
+        self.pipe_body.fill(GREEN)
         for i in range(10):
             shade_color = tuple(max(0, c - i * 8) for c in GREEN)
-            pygame.draw.rect(screen, shade_color, (self.x + i, self.bottom_y, 8, SCREEN_HEIGHT - self.bottom_y))
+            pygame.draw.rect(self.pipe_body, shade_color, (i, 0, 8, height))
+        pygame.draw.rect(self.pipe_body, (100, 180, 100), (0, 0, 15, height))
         
-        pygame.draw.rect(screen, (100, 180, 100), (self.x, self.bottom_y, 15, SCREEN_HEIGHT - self.bottom_y))
+        self.pipe_cap = self._surface((pipe_width + 10, 20))
+        self.pipe_cap.fill(DARK_GREEN)
         
-        # Bottom cap
-        cap_bottom = pygame.Rect(self.x - 5, self.bottom_y, self.width + 10, self.cap_height)
-        pygame.draw.rect(screen, DARK_GREEN, cap_bottom)
+        # Static background of each screen, used to erase dirty rects
+        self.background = self._surface((width, height))
+        self.background.blit(self.sky, (0, 0))
+        self.background.blit(self.ground, (0, ground_y - self.grass_height))
+        self.background_plain = self._surface((width, height))
+        self.background_plain.blit(self.sky, (0, 0))
+        self.background_plain.blit(self.ground_plain, (0, ground_y - 1))
     
-    def get_collision_rects(self):
-        return [
-            pygame.Rect(self.x, 0, self.width, self.top_height),
-            pygame.Rect(self.x, self.bottom_y, self.width, SCREEN_HEIGHT - self.bottom_y),
-            pygame.Rect(self.x - 5, self.top_height - self.cap_height, self.width + 10, self.cap_height),
-            pygame.Rect(self.x - 5, self.bottom_y, self.width + 10, self.cap_height)
-        ]
+    def _surface(self, size):
+        surface = pygame.Surface(size)
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()
+        return surface
+
+class GameState:
+    """Gameplay state of a Game as plain values, taken by Game.snapshot.
+
+    Holds no pygame objects, so it is cheap to take, compare and keep around
+    in a search tree, and can be restored into any Game, headless or not.
+    """
+    __slots__ = ('bird', 'pipes', 'power_ups', 'score', 'game_over', 'death_cause',
+                 'next_pipe', 'power_up_spawn_timer', 'rng_state', 'level_index')
+    
+    def __init__(self, bird, pipes, power_ups, score, game_over, death_cause,
+                 next_pipe, power_up_spawn_timer, rng_state, level_index=0):
+        # bird: (y, prev_y, velocity, angle, wing_flap, then active flag and timer of
+        #        shield, slow motion, magnet and double points)
+        # pipes: (x, prev_x, top_height, scored) per pipe
+        # power_ups: (x, prev_x, y, type, animation) per power-up
+        self.bird = bird
+        self.pipes = pipes
+        self.power_ups = power_ups
+        self.score = score
+        self.game_over = game_over
+        self.death_cause = death_cause
+        self.next_pipe = next_pipe
+        self.power_up_spawn_timer = power_up_spawn_timer
+        self.rng_state = rng_state
+        # Pipes taken from the game's LevelGenerator so far
+        self.level_index = level_index
+    
+    def _key(self):
+        return (self.bird, self.pipes, self.power_ups, self.score, self.game_over, self.death_cause,
+                self.next_pipe, self.power_up_spawn_timer, self.rng_state, self.level_index)
+    
+    def __eq__(self, other):
+        if not isinstance(other, GameState):
+            return NotImplemented
+        return self._key() == other._key()
+    
+    def __hash__(self):
+        return hash(self._key())
 
 class Game:
-    def __init__(self):
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-        pygame.display.set_caption("Flappy Bird - Enhanced Edition")
-        self.clock = pygame.time.Clock()
-        self.high_score_file = "highscore.txt"
+    def __init__(self, headless=False, obs_buffer=None, high_score_file="highscore.txt", profiler=None,
+                 dirty_rects=False, time_scale=1.0, trail_length=TRAIL_LENGTH, offscreen=False, controller=None,
+                 level=None):
+        # Headless mode only steps the physics: no window, fonts, clock or effects
+        self.headless = headless
+        # Offscreen games draw every frame into a plain surface and never open a
+        # window, for capturing frames (see frames.FrameCapture)
+        self.offscreen = offscreen
+        # Optional FrameProfiler timing every update and draw stage
+        self.profiler = profiler
+        # True while the profiler is one F3 created, which F3 may also drop again
+        self.own_profiler = False
+        # Optional controller(game) -> jump, asked before every tick of run(),
+        # e.g. an inference.BridgeController playing instead of the keyboard
+        self.controller = controller
+        # Optional level.LevelGenerator laying out pipes and power-ups instead
+        # of rng, it can be shared with other games
+        self.level = level
+        # Simulated seconds per real second in run(), above 1 fast-forwards
+        self.time_scale = time_scale
+        # Fraction of a tick between the last update and the frame being drawn
+        self.alpha = 1.0
+        # Nothing draws the bird's trail headless, so it is not recorded either
+        self.trail_length = 0 if headless else trail_length
+        self.physics_stages = (
+            ('power_ups', self.update_power_ups),
+            ('bird', self.update_bird),
+            ('pipes', self.update_pipes),
+        )
+        self.play_update_stages = (('effects', self.update_effects),) + self.physics_stages
+        self.game_over_update_stages = (('effects', self.update_effects),)
+        if headless:
+            self.screen = None
+            self.clock = None
+        else:
+            if offscreen:
+                self.screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+            else:
+                init_display()
+                self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+                pygame.display.set_caption("Flappy Bird - Enhanced Edition")
+            self.clock = pygame.time.Clock()
+            self.sprites = SpriteCache(SCREEN_WIDTH, SCREEN_HEIGHT, 50)
+            self.circles = CircleSpriteCache()
+            self.particles = ParticleSystem()
+            self.font = get_font(74)
+            self.small_font = get_font(36)
+            # HUD text only gets re-rendered when its string changes
+            self.text = TextCache()
+            
+            # With dirty rects only the areas drawn this frame or the last one
+            # are erased and pushed to the display, instead of a full flip
+            self.dirty = [] if dirty_rects and not offscreen else None
+            self.last_dirty = []
+            self.full_frame = True
+            self.needs_full_redraw = True
+            self.last_game_over = False
+            
+            # Draw stages in order, timed separately by the profiler
+            self.play_stages = (
+                ('sky', self.draw_sky),
+                ('clouds', self.draw_clouds),
+                ('ground', self.draw_ground),
+                ('pipes', self.draw_pipes),
+                ('effects', self.draw_effects),
+                ('bird', self.draw_bird),
+                ('hud', self.draw_hud),
+                ('present', self.present),
+            )
+            self.game_over_stages = tuple(stage for stage in self.play_stages if stage[0] not in ('pipes', 'bird'))
+        # Training runs must not race on the player's high score file
+        self.high_score_file = None if headless or offscreen else high_score_file
+        # Every finished game is recorded, a .db path keeps them in SQLite
+        self.score_store = None if self.high_score_file is None else open_score_store(self.high_score_file)
         self.high_score = self.load_high_score()
         self.new_record = False
+        # Any writable float buffer works, e.g. a slice of shared memory
+        self.observation = obs_buffer if obs_buffer is not None else array('f', [0.0] * OBS_SIZE)
+        # Pipes and power-ups that left the screen, reused for the next ones spawned
+        self.pipes = []
+        self.pipe_pool = []
+        self.power_ups = []
+        self.power_up_pool = []
         self.reset()
     
     def load_high_score(self):
-        """Load high score from file"""
-        try:
-            with open(self.high_score_file, 'r') as f:
-                return int(f.read())
-        except (FileNotFoundError, ValueError):
+        """Best player score in the score store"""
+        if self.score_store is None:
             return 0
+        return self.score_store.best(PLAYER)
     
-    def save_high_score(self, score):
-        """Save high score to file"""
-        try:
-            with open(self.high_score_file, 'w') as f:
-                f.write(str(score))
-        except:
-            pass
+    def end_game(self, cause):
+        # One death is recorded once, whatever else the bird hits that tick
+        if self.game_over:
+            return
+        self.game_over = True
+        self.death_cause = cause
+        # Only queued here, the store writes on its own thread
+        if self.score_store is not None:
+            self.score_store.add(self.score, PLAYER, self.seed)
+        # Check for new high score
+        if self.score > self.high_score:
+            self.high_score = self.score
+            self.new_record = True
+        self.create_collision_particles(int(self.bird.x + self.bird.width // 2), int(self.bird.y + self.bird.height // 2))
     
-    def reset(self):
-        self.bird = Bird(100, SCREEN_HEIGHT // 2)
-        self.pipes = []
+    def close(self):
+        """Write out queued scores, raises if the store failed to write"""
+        if self.score_store is not None:
+            self.score_store.close()
+    
+    def reset(self, seed=None):
+        # Gameplay (pipes, power-ups) and visuals draw from separate streams,
+        # so the same seed plays the same level with or without rendering
+        self.seed = seed
+        self.rng = random.Random(seed)
+        fx_seed = self.rng.getrandbits(64)
+        # Headless games draw no effects, so they skip the 2.5 KB generator state
+        self.fx_rng = None if self.headless else random.Random(fx_seed)
+        
+        self.bird = Bird(100, SCREEN_HEIGHT // 2, self.trail_length)
+        self.pipe_pool.extend(self.pipes)
+        self.pipes.clear()
         self.score = 0
         self.game_over = False
-        self.scored_pipes = set()
+        self.death_cause = None
+        # Index of the first pipe whose right edge is still ahead of the bird
+        self.next_pipe = 0
+        # Pipes and power-ups scroll together, a level can speed them up
+        self.scroll_speed = 3
+        self.level_index = 0
         self.new_record = False
         
         for i in range(3):
-            self.pipes.append(Pipe(SCREEN_WIDTH + i * 400, SCREEN_HEIGHT - 150))
+            self.spawn_pipe(SCREEN_WIDTH + i * 400)
         
         self.clouds = []
-        for i in range(5):
-            self.clouds.append(Cloud(random.randint(0, SCREEN_WIDTH * 2), random.randint(50, 250)))
-        
-        self.font = pygame.font.Font(None, 74)
-        self.small_font = pygame.font.Font(None, 36)
+        if not self.headless:
+            for i in range(5):
+                self.clouds.append(Cloud(self.fx_rng.randint(0, SCREEN_WIDTH * 2), self.fx_rng.randint(50, 250), self.fx_rng))
+            # Far clouds first, re-sorted only when one wraps and re-rolls its depth
+            self.clouds.sort(key=lambda c: c.z, reverse=True)
         self.ground_height = 50
         
-        self.particles = []
+        if not self.headless:
+            self.particles.clear(self.fx_rng.getrandbits(64))
+            self.needs_full_redraw = True
         self.glow_effects = []
         
         self.screen_shake_x = 0
@@ -389,22 +848,171 @@ class Game:
         self.screen_shake_intensity = 0
         
         # Power-ups
-        self.power_ups = []
+        self.power_up_pool.extend(self.power_ups)
+        self.power_ups.clear()
         self.power_up_spawn_timer = 0
+        
+        self.write_observation()
+        return self.observation
+    
+    def step(self, action):
+        """Jump if action is truthy and advance one tick, returns (observation, reward, done)"""
+        if self.game_over:
+            return self.observation, 0, True
+        
+        if action:
+            self.bird.jump()
+        old_score = self.score
+        self.update()
+        self.write_observation()
+        return self.observation, self.score - old_score, self.game_over
+    
+    def spawn_pipe(self, x):
+        """Add a pipe at x with a random gap, recycled from the pool when there is one"""
+        if self.level is not None:
+            return self.spawn_level_pipe(x)
+        if self.pipe_pool:
+            pipe = self.pipe_pool.pop()
+            pipe.place(x, self.rng.randint(100, SCREEN_HEIGHT - 150))
+        else:
+            pipe = Pipe(x, SCREEN_HEIGHT - 150, self.rng)
+        self.pipes.append(pipe)
+        return pipe
+    
+    def spawn_level_pipe(self, x):
+        """Add the level's next pipe at x, everything on screen takes on its speed"""
+        top_height, gap, speed = self.level.pipe(self.level_index)
+        self.level_index += 1
+        pipe = self.pipe_pool.pop() if self.pipe_pool else Pipe(x, SCREEN_HEIGHT - 150, top_height=top_height)
+        pipe.place(x, top_height, gap)
+        self.pipes.append(pipe)
+        self.set_scroll_speed(speed)
+        return pipe
+    
+    def set_scroll_speed(self, speed):
+        self.scroll_speed = speed
+        for pipe in self.pipes:
+            pipe.speed = speed
+    
+    def spawn_power_up(self, x, y, power_type):
+        if self.power_up_pool:
+            pu = self.power_up_pool.pop()
+            pu.place(x, y, power_type)
+        else:
+            pu = PowerUp(x, y, power_type)
+        self.power_ups.append(pu)
+        return pu
+    
+    def snapshot(self):
+        """Gameplay state only, no visuals; restore() continues the game exactly from it"""
+        bird = self.bird
+        return GameState(
+            (bird.y, bird.prev_y, bird.velocity, bird.angle, bird.wing_flap,
+             bird.shield_active, bird.shield_timer, bird.slow_motion_active, bird.slow_motion_timer,
+             bird.magnet_active, bird.magnet_timer, bird.double_points_active, bird.double_points_timer),
+            tuple([(pipe.x, pipe.prev_x, pipe.top_height, pipe.scored) for pipe in self.pipes]),
+            tuple([(pu.x, pu.prev_x, pu.y, pu.type, pu.animation) for pu in self.power_ups]),
+            self.score, self.game_over, self.death_cause, self.next_pipe, self.power_up_spawn_timer,
+            self.rng.getstate(), self.level_index,
+        )
+    
+    def restore(self, state):
+        """Put the game back into a GameState taken with snapshot(), from this game or another"""
+        self.score = state.score
+        self.game_over = state.game_over
+        self.death_cause = state.death_cause
+        self.next_pipe = state.next_pipe
+        self.power_up_spawn_timer = state.power_up_spawn_timer
+        self.level_index = state.level_index
+        
+        bird = self.bird
+        (bird.y, bird.prev_y, bird.velocity, bird.angle, bird.wing_flap,
+         bird.shield_active, bird.shield_timer, bird.slow_motion_active, bird.slow_motion_timer,
+         bird.magnet_active, bird.magnet_timer, bird.double_points_active, bird.double_points_timer) = state.bird
+        bird.rect.y = bird.y
+        bird.trail_count = 0
+        
+        # Existing and pooled objects are moved into place, a restore allocates nothing
+        pipes = self.pipes
+        while len(pipes) < len(state.pipes):
+            pipes.append(self.pipe_pool.pop() if self.pipe_pool else Pipe(0, SCREEN_HEIGHT - 150, top_height=0))
+        while len(pipes) > len(state.pipes):
+            self.pipe_pool.append(pipes.pop())
+        # A level's pipes are the last ones taken from it, their gaps and speed come from there
+        first = self.level_index - len(pipes)
+        for i, (pipe, (x, prev_x, top_height, scored)) in enumerate(zip(pipes, state.pipes)):
+            pipe.place(x, top_height, None if self.level is None else self.level.pipe(first + i)[1])
+            pipe.prev_x = prev_x
+            pipe.scored = scored
+        if self.level is not None and self.level_index:
+            self.set_scroll_speed(self.level.pipe(self.level_index - 1)[2])
+        
+        self.power_up_pool.extend(self.power_ups)
+        self.power_ups.clear()
+        for x, prev_x, y, power_type, animation in state.power_ups:
+            pu = self.spawn_power_up(x, y, power_type)
+            pu.prev_x = prev_x
+            pu.animation = animation
+        
+        self.rng.setstate(state.rng_state)
+        if not self.headless:
+            self.needs_full_redraw = True
+        self.write_observation()
+        return self.observation
+    
+    def simulate(self, actions):
+        """Fast-forward through a sequence of actions, returns (reward, done).
+        
+        Meant for planning on a headless game: only the physics run and the
+        observation is written once at the end. Pair with snapshot()/restore()
+        to try several action sequences from the same state.
+        """
+        old_score = self.score
+        bird = self.bird
+        update_physics = self.update_physics
+        for action in actions:
+            if self.game_over:
+                break
+            if action:
+                bird.jump()
+            update_physics()
+        self.write_observation()
+        return self.score - old_score, self.game_over
+    
+    def write_observation(self):
+        """Fill self.observation in place from the current game state"""
+        bird = self.bird
+        obs = self.observation
+        obs[0] = bird.y
+        obs[1] = bird.velocity
+        
+        # Next pipe is the first one the bird has not passed yet
+        for pipe in self.pipes:
+            if pipe.x + pipe.width >= bird.x:
+                obs[2] = pipe.x
+                obs[3] = pipe.top_height
+                obs[4] = pipe.bottom_y
+                break
+        
+        obs[5] = bird.shield_timer if bird.shield_active else 0
+        obs[6] = bird.magnet_timer if bird.magnet_active else 0
+        obs[7] = bird.double_points_timer if bird.double_points_active else 0
     
     def add_screen_shake(self, intensity=10):
         self.screen_shake_intensity += intensity
         self.screen_shake_intensity = min(self.screen_shake_intensity, 30)
     
     def create_star_particles(self, x, y):
-        for _ in range(15):
-            self.particles.append(Particle(x, y, YELLOW, random.uniform(-3, 3), random.uniform(-6, -2), random.randint(20, 40)))
+        if self.headless:
+            return
+        self.particles.emit(x, y, YELLOW, 15, (-3, 3), (-6, -2), (20, 40))
         self.glow_effects.append(GlowEffect(x, y, 50, YELLOW, 15))
         self.add_screen_shake(3)
     
     def create_collision_particles(self, x, y):
-        for _ in range(30):
-            self.particles.append(Particle(x, y, RED, random.uniform(-8, 8), random.uniform(-8, 8), random.randint(15, 30)))
+        if self.headless:
+            return
+        self.particles.emit(x, y, RED, 30, (-8, 8), (-8, 8), (15, 30))
         self.add_screen_shake(20)
     
     def handle_events(self):
@@ -422,31 +1030,129 @@ class Game:
                     self.reset()
                 else:
                     self.bird.jump()
+            if event.type == pygame.VIDEORESIZE:
+                self.sprites.build(event.w, event.h, self.ground_height)
+                self.needs_full_redraw = True
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                self.toggle_profiler_overlay()
         return True
     
+    def toggle_profiler_overlay(self):
+        if self.profiler is None:
+            self.profiler = FrameProfiler(overlay=True)
+            self.own_profiler = True
+        elif self.own_profiler and self.profiler.overlay and self.profiler.callback is None:
+            # Nobody else is listening, stop timing altogether
+            self.profiler = None
+            self.own_profiler = False
+        else:
+            self.profiler.overlay = not self.profiler.overlay
+    
+    def update_stages(self):
+        """The update pipeline for the current tick as (name, method) pairs"""
+        if self.headless:
+            # Same as update_physics, nothing moves once the game is over
+            return () if self.game_over else self.physics_stages
+        if self.game_over:
+            return self.game_over_update_stages
+        return self.play_update_stages
+    
     def update(self):
+        if self.profiler is not None:
+            self.profiler.run('update', self.update_stages())
+            if self.headless:
+                self.profiler.end_frame()
+            return
+        
+        if self.headless:
+            self.update_physics()
+            return
+        
+        self.update_effects()
+        self.update_physics()
+    
+    def update_effects(self):
+        """Particles, glows, screen shake and clouds"""
+        self.particles.update()
+        self.update_glow_effects()
+        
         if self.game_over:
-            self.particles = [p for p in self.particles if p.update()]
-            self.glow_effects = [g for g in self.glow_effects if g.update()]
             self.screen_shake_intensity *= 0.9
-            self.screen_shake_x = random.randint(-int(self.screen_shake_intensity), int(self.screen_shake_intensity))
-            self.screen_shake_y = random.randint(-int(self.screen_shake_intensity), int(self.screen_shake_intensity))
+            self.screen_shake_x = self.fx_rng.randint(-int(self.screen_shake_intensity), int(self.screen_shake_intensity))
+            self.screen_shake_y = self.fx_rng.randint(-int(self.screen_shake_intensity), int(self.screen_shake_intensity))
             return
         
         if self.screen_shake_intensity > 0.1:
             self.screen_shake_intensity *= 0.9
-            self.screen_shake_x = random.randint(-int(self.screen_shake_intensity), int(self.screen_shake_intensity))
-            self.screen_shake_y = random.randint(-int(self.screen_shake_intensity), int(self.screen_shake_intensity))
+            self.screen_shake_x = self.fx_rng.randint(-int(self.screen_shake_intensity), int(self.screen_shake_intensity))
+            self.screen_shake_y = self.fx_rng.randint(-int(self.screen_shake_intensity), int(self.screen_shake_intensity))
         else:
             self.screen_shake_x = 0
             self.screen_shake_y = 0
         
-        self.particles = [p for p in self.particles if p.update()]
-        self.glow_effects = [g for g in self.glow_effects if g.update()]
+        wrapped = False
+        for cloud in self.clouds:
+            if cloud.update():
+                wrapped = True
+        if wrapped:
+            self.clouds.sort(key=lambda c: c.z, reverse=True)
+    
+    def update_glow_effects(self):
+        expired = False
+        for glow in self.glow_effects:
+            if not glow.update():
+                expired = True
+        if expired:
+            self.glow_effects = [g for g in self.glow_effects if g.lifetime > 0]
+    
+    def update_physics(self):
+        """Advance bird, pipes and power-ups by one tick"""
+        if self.game_over:
+            return
+        
+        self.update_power_ups()
+        self.update_bird()
+        self.update_pipes()
+    
+    def update_power_ups(self):
+        self.maybe_spawn_power_up()
+        
+        # Update power-ups
+        for pu in self.power_ups:
+            pu.prev_x = pu.x
+            pu.x -= self.scroll_speed  # Move with pipes
+            pu.rect.x = pu.x
+            pu.rect.y = pu.y
+            pu.update()
+            
+            # Check collision
+            if self.bird.rect.colliderect(pu.rect) and not self.game_over:
+                if pu.type == 'shield':
+                    self.bird.shield_active = True
+                    self.bird.shield_timer = 600  # 10 seconds at 60 FPS
+                elif pu.type == 'magnet':
+                    self.bird.magnet_active = True
+                    self.bird.magnet_timer = 1200  # 20 seconds
+                elif pu.type == 'double':
+                    self.bird.double_points_active = True
+                    self.bird.double_points_timer = 1800  # 30 seconds
+                
+                self.create_star_particles(pu.x, pu.y)
+                self.power_ups.remove(pu)
+                self.power_up_pool.append(pu)
+        
+        # Power-ups spawn at the same x and scroll together, so the ones gone are in front
+        while self.power_ups and self.power_ups[0].x <= -50:
+            self.power_up_pool.append(self.power_ups.pop(0))
+    
+    def maybe_spawn_power_up(self):
+        if self.level is not None:
+            self.spawn_level_power_ups()
+            return
         
         # Spawn power-ups occasionally
         self.power_up_spawn_timer += 1
-        if self.power_up_spawn_timer > 180 and random.random() < 0.01 and not self.game_over:
+        if self.power_up_spawn_timer > 180 and self.rng.random() < 0.01 and not self.game_over:
             # Find a safe location away from pipes
             pu_x = SCREEN_WIDTH + 50
             safe_y = None
@@ -454,7 +1160,7 @@ class Game:
             
             # Try to find a safe Y position
             while safe_y is None and attempts < 50:
-                test_y = random.randint(150, SCREEN_HEIGHT - 250)
+                test_y = self.rng.randint(150, SCREEN_HEIGHT - 250)
                 is_safe = True
                 
                 # Check if this position is too close to any pipe
@@ -473,194 +1179,261 @@ class Game:
             
             if safe_y is not None:
                 power_types = ['shield', 'magnet', 'double']
-                self.power_ups.append(PowerUp(pu_x, safe_y, random.choice(power_types)))
+                self.spawn_power_up(pu_x, safe_y, self.rng.choice(power_types))
                 self.power_up_spawn_timer = 0
-        
-        # Update power-ups
-        for pu in self.power_ups:
-            pu.x -= 3  # Move with pipes
-            pu.rect.x = pu.x
-            pu.rect.y = pu.y
-            pu.update()
-            
-            # Check collision
-            if self.bird.rect.colliderect(pu.rect) and not self.game_over:
-                if pu.type == 'shield':
-                    self.bird.shield_active = True
-                    self.bird.shield_timer = 600  # 10 seconds at 60 FPS
-                elif pu.type == 'magnet':
-                    self.bird.magnet_active = True
-                    self.bird.magnet_timer = 1200  # 20 seconds
-                elif pu.type == 'double':
-                    self.bird.double_points_active = True
-                    self.bird.double_points_timer = 1800  # 30 seconds
-                
-                self.create_star_particles(pu.x, pu.y)
-                self.power_ups.remove(pu)
-        
-        self.power_ups = [pu for pu in self.power_ups if pu.x > -50]
-        
+    
+    def spawn_level_power_ups(self):
+        """Spawn a level's power-up the tick its slot behind a pipe scrolls past the spawn x"""
+        if self.game_over:
+            return
+        spawn_x = SCREEN_WIDTH + 50
+        offset = self.level.power_up_offset
+        first = self.level_index - len(self.pipes)
+        for i, pipe in enumerate(self.pipes):
+            if pipe.x + offset <= spawn_x < pipe.prev_x + offset:
+                power_up = self.level.power_up(first + i)
+                if power_up is not None:
+                    power_type, y = power_up
+                    self.spawn_power_up(pipe.x + offset, y, power_type)
+    
+    def update_bird(self):
         self.bird.update()
         
         ground_y = SCREEN_HEIGHT - self.ground_height
         if self.bird.y < 0 or self.bird.y + self.bird.height > ground_y:
-            self.game_over = True
-            # Check for new high score
-            if self.score > self.high_score:
-                self.high_score = self.score
-                self.save_high_score(self.score)
-                self.new_record = True
-            self.create_collision_particles(int(self.bird.x + self.bird.width // 2), int(self.bird.y + self.bird.height // 2))
-        
-        for cloud in self.clouds:
-            cloud.update()
-        
-        old_score = self.score
+            self.end_game('ceiling' if self.bird.y < 0 else 'ground')
+    
+    def update_pipes(self):
         for pipe in self.pipes:
             pipe.update()
             
-            for rect in pipe.get_collision_rects():
-                if self.bird.rect.colliderect(rect) and not self.bird.shield_active:
-                    self.game_over = True
-                    # Check for new high score
-                    if self.score > self.high_score:
-                        self.high_score = self.score
-                        self.save_high_score(self.score)
-                        self.new_record = True
-                    self.create_collision_particles(int(self.bird.x + self.bird.width // 2), int(self.bird.y + self.bird.height // 2))
-                    break
-            
-            if pipe.x + pipe.width < self.bird.x and pipe not in self.scored_pipes:
+            if pipe.x + pipe.width < self.bird.x and not pipe.scored:
                 points = 2 if self.bird.double_points_active else 1
                 self.score += points
-                self.scored_pipes.add(pipe)
+                pipe.scored = True
                 gap_center_y = pipe.top_height + (pipe.bottom_y - pipe.top_height) // 2
                 self.create_star_particles(pipe.x + pipe.width // 2, gap_center_y)
         
-        self.pipes = [pipe for pipe in self.pipes if pipe.x + pipe.width > 0]
+        # Broad phase: pipes are 400px apart, so only the next one can reach the bird
+        bird_left = self.bird.x
+        bird_right = self.bird.x + self.bird.width
+        while self.pipes[self.next_pipe].x + self.pipes[self.next_pipe].width + 5 <= bird_left:
+            self.next_pipe += 1
+        pipe = self.pipes[self.next_pipe]
+        # A bird that already hit the ground or ceiling this tick keeps that cause
+        if not self.game_over and pipe.overlaps_x(bird_left, bird_right) and not self.bird.shield_active:
+            if self.bird.rect.collidelist(pipe.get_collision_rects()) != -1:
+                self.end_game('pipe')
+        
+        self.recycle_pipes()
+    
+    def recycle_pipes(self):
+        # Pipes leave from the front of the list, all of them behind next_pipe
+        while self.pipes[0].x + self.pipes[0].width <= 0:
+            self.pipe_pool.append(self.pipes.pop(0))
+            self.next_pipe -= 1
         
         if self.pipes and self.pipes[-1].x < SCREEN_WIDTH - 400:
-            self.pipes.append(Pipe(SCREEN_WIDTH, SCREEN_HEIGHT - 150))
-            self.pipes = [pipe for pipe in self.pipes if pipe.x > -200]
+            self.spawn_pipe(SCREEN_WIDTH)
     
-    def draw(self):
-        # Sky gradient
-        for y in range(SCREEN_HEIGHT - self.ground_height):
-            color_value = min(255, 135 + y // 3)
-            color = (color_value, 206, min(255, 235 + y // 4))
-            pygame.draw.line(self.screen, color, (0, y), (SCREEN_WIDTH, y))
+    def draw_stages(self):
+        """The draw pipeline for the current frame as (name, method) pairs"""
+        if self.game_over:
+            return self.game_over_stages
+        return self.play_stages
+    
+    def draw(self, alpha=1.0):
+        """Draw a frame alpha of the way from the previous tick to the current one"""
+        self.alpha = alpha
+        if self.profiler is not None:
+            self.profiler.run('draw', self.draw_stages())
+            self.profiler.end_frame()
+            return
+        
+        for name, stage in self.draw_stages():
+            stage()
+    
+    def mark_dirty(self, rect):
+        """Record a rect drawn this frame, a no-op without dirty rects"""
+        if self.dirty is not None and rect is not None:
+            self.dirty.append(rect)
+    
+    def blit(self, surface, position):
+        self.mark_dirty(self.screen.blit(surface, position))
+    
+    def draw_sky(self):
+        if self.dirty is None:
+            self.screen.blit(self.sprites.sky, (0, 0))
+            return
+        
+        # Shaking moves the whole frame, so it always gets redrawn and flipped
+        self.full_frame = (self.needs_full_redraw or self.game_over != self.last_game_over or
+                           self.screen_shake_x != 0 or self.screen_shake_y != 0)
+        self.needs_full_redraw = False
+        self.last_game_over = self.game_over
+        self.dirty = []
+        if self.full_frame:
+            self.screen.blit(self.sprites.sky, (0, 0))
+            return
+        
+        # Everything outside last frame's rects is still plain background
+        background = self.sprites.background_plain if self.game_over else self.sprites.background
+        screen_rect = self.screen.get_rect()
+        for rect in self.last_dirty:
+            rect = rect.clip(screen_rect)
+            if rect.width and rect.height:
+                self.screen.blit(background, rect, rect)
+    
+    def draw_clouds(self):
+        for cloud in self.clouds:
+            self.mark_dirty(cloud.draw(self.screen))
+    
+    def draw_ground(self):
+        sprites = self.sprites
+        ground_y = SCREEN_HEIGHT - self.ground_height
+        if self.game_over:
+            ground, top = sprites.ground_plain, ground_y - 1
+        else:
+            ground, top = sprites.ground, ground_y - sprites.grass_height
         
-        # Clouds
-        sorted_clouds = sorted(self.clouds, key=lambda c: c.z, reverse=True)
-        for cloud in sorted_clouds:
-            cloud.draw(self.screen)
+        if self.dirty is None or self.full_frame:
+            self.screen.blit(ground, (0, top))
+            return
+        
+        # The ground is already in place, only clouds drawn over it need covering
+        ground_rect = ground.get_rect(topleft=(0, top))
+        for rect in self.dirty:
+            rect = rect.clip(ground_rect)
+            if rect.width and rect.height:
+                self.screen.blit(ground, rect, rect.move(0, -top))
+    
+    def draw_pipes(self):
+        for pipe in self.pipes:
+            self.mark_dirty(pipe.draw(self.screen, self.sprites, self.alpha))
         
+        # Draw power-ups
+        for pu in self.power_ups:
+            self.mark_dirty(pu.draw(self.screen, self.alpha))
+    
+    def draw_effects(self):
+        for glow in self.glow_effects:
+            self.mark_dirty(glow.draw(self.screen, self.circles))
+        self.mark_dirty(self.particles.draw(self.screen, self.circles))
+    
+    def draw_bird(self):
+        self.mark_dirty(self.bird.draw(self.screen, self.alpha))
+    
+    def draw_hud(self):
         if not self.game_over:
-            ground_y = SCREEN_HEIGHT - self.ground_height
-            pygame.draw.rect(self.screen, GRASS_GREEN, (0, ground_y, SCREEN_WIDTH, self.ground_height))
-            
-            for x in range(0, SCREEN_WIDTH, 20):
-                for i in range(3):
-                    grass_start_x = x + i * 6
-                    pygame.draw.line(self.screen, (100, 200, 100), 
-                                   (grass_start_x, ground_y), 
-                                   (grass_start_x + random.randint(-5, 5), ground_y - random.randint(5, 15)), 2)
-            
-            pygame.draw.line(self.screen, DARK_GREEN, (0, ground_y), (SCREEN_WIDTH, ground_y), 3)
-            
-            for pipe in self.pipes:
-                pipe.draw(self.screen)
-            
-            # Draw power-ups
-            for pu in self.power_ups:
-                pu.draw(self.screen)
-            
-            for glow in self.glow_effects:
-                glow.draw(self.screen)
-            
-            for particle in self.particles:
-                particle.draw(self.screen)
-            
-            self.bird.draw(self.screen)
-            
-            score_shadow = self.font.render(str(self.score), True, BLACK)
-            score_text = self.font.render(str(self.score), True, YELLOW)
-            self.screen.blit(score_shadow, (SCREEN_WIDTH // 2 - 18 + self.screen_shake_x, 52 + self.screen_shake_y))
-            self.screen.blit(score_text, (SCREEN_WIDTH // 2 - 20 + self.screen_shake_x, 50 + self.screen_shake_y))
+            score_shadow = self.text.render(self.font, str(self.score), BLACK)
+            score_text = self.text.render(self.font, str(self.score), YELLOW)
+            self.blit(score_shadow, (SCREEN_WIDTH // 2 - 18 + self.screen_shake_x, 52 + self.screen_shake_y))
+            self.blit(score_text, (SCREEN_WIDTH // 2 - 20 + self.screen_shake_x, 50 + self.screen_shake_y))
             
             # High score in top right
-            high_score_display = self.small_font.render(f"Best: {self.high_score}", True, WHITE)
-            self.screen.blit(high_score_display, (SCREEN_WIDTH - 120, 10))
+            high_score_display = self.text.render(self.small_font, f"Best: {self.high_score}", WHITE)
+            self.blit(high_score_display, (SCREEN_WIDTH - 120, 10))
             
             # Power-up indicators
             y_offset = 10
             if self.bird.shield_active:
-                status = self.small_font.render(f"SHIELD {int(self.bird.shield_timer/60)}s", True, CYAN)
-                self.screen.blit(status, (10, y_offset))
+                status = self.text.render(self.small_font, f"SHIELD {int(self.bird.shield_timer/60)}s", CYAN)
+                self.blit(status, (10, y_offset))
                 y_offset += 30
             if self.bird.magnet_active:
-                status = self.small_font.render(f"MAGNET {int(self.bird.magnet_timer/60)}s", True, PURPLE)
-                self.screen.blit(status, (10, y_offset))
+                status = self.text.render(self.small_font, f"MAGNET {int(self.bird.magnet_timer/60)}s", PURPLE)
+                self.blit(status, (10, y_offset))
                 y_offset += 30
             if self.bird.double_points_active:
-                status = self.small_font.render(f"2X POINTS {int(self.bird.double_points_timer/60)}s", True, GOLD)
-                self.screen.blit(status, (10, y_offset))
+                status = self.text.render(self.small_font, f"2X POINTS {int(self.bird.double_points_timer/60)}s", GOLD)
+                self.blit(status, (10, y_offset))
                 y_offset += 30
         
         else:
-            ground_y = SCREEN_HEIGHT - self.ground_height
-            pygame.draw.rect(self.screen, GRASS_GREEN, (0, ground_y, SCREEN_WIDTH, self.ground_height))
-            pygame.draw.line(self.screen, DARK_GREEN, (0, ground_y), (SCREEN_WIDTH, ground_y), 3)
-            
-            for glow in self.glow_effects:
-                glow.draw(self.screen)
-            for particle in self.particles:
-                particle.draw(self.screen)
-            
             shake_x = self.screen_shake_x
             shake_y = self.screen_shake_y
             
-            game_over_shadow = self.font.render("Game Over", True, BLACK)
-            game_over_text = self.font.render("Game Over", True, RED)
-            score_text_shadow = self.font.render(f"Score: {self.score}", True, BLACK)
-            score_text = self.font.render(f"Score: {self.score}", True, YELLOW)
-            restart_shadow = self.small_font.render("Press SPACE to restart", True, BLACK)
-            restart_text = self.small_font.render("Press SPACE to restart", True, WHITE)
+            game_over_shadow = self.text.render(self.font, "Game Over", BLACK)
+            game_over_text = self.text.render(self.font, "Game Over", RED)
+            score_text_shadow = self.text.render(self.font, f"Score: {self.score}", BLACK)
+            score_text = self.text.render(self.font, f"Score: {self.score}", YELLOW)
+            restart_shadow = self.text.render(self.small_font, "Press SPACE to restart", BLACK)
+            restart_text = self.text.render(self.small_font, "Press SPACE to restart", WHITE)
             
-            self.screen.blit(game_over_shadow, (SCREEN_WIDTH // 2 - 148 + shake_x, SCREEN_HEIGHT // 2 - 98 + shake_y))
-            self.screen.blit(game_over_text, (SCREEN_WIDTH // 2 - 150 + shake_x, SCREEN_HEIGHT // 2 - 100 + shake_y))
+            self.blit(game_over_shadow, (SCREEN_WIDTH // 2 - 148 + shake_x, SCREEN_HEIGHT // 2 - 98 + shake_y))
+            self.blit(game_over_text, (SCREEN_WIDTH // 2 - 150 + shake_x, SCREEN_HEIGHT // 2 - 100 + shake_y))
             
-            self.screen.blit(score_text_shadow, (SCREEN_WIDTH // 2 - 78 + shake_x, SCREEN_HEIGHT // 2 + 2 + shake_y))
-            self.screen.blit(score_text, (SCREEN_WIDTH // 2 - 80 + shake_x, SCREEN_HEIGHT // 2 + shake_y))
+            self.blit(score_text_shadow, (SCREEN_WIDTH // 2 - 78 + shake_x, SCREEN_HEIGHT // 2 + 2 + shake_y))
+            self.blit(score_text, (SCREEN_WIDTH // 2 - 80 + shake_x, SCREEN_HEIGHT // 2 + shake_y))
             
             # High score display
-            high_score_text = self.small_font.render(f"Best: {self.high_score}", True, YELLOW)
-            high_score_shadow = self.small_font.render(f"Best: {self.high_score}", True, BLACK)
-            self.screen.blit(high_score_shadow, (SCREEN_WIDTH // 2 - 68 + shake_x, SCREEN_HEIGHT // 2 + 52 + shake_y))
-            self.screen.blit(high_score_text, (SCREEN_WIDTH // 2 - 70 + shake_x, SCREEN_HEIGHT // 2 + 50 + shake_y))
+            high_score_text = self.text.render(self.small_font, f"Best: {self.high_score}", YELLOW)
+            high_score_shadow = self.text.render(self.small_font, f"Best: {self.high_score}", BLACK)
+            self.blit(high_score_shadow, (SCREEN_WIDTH // 2 - 68 + shake_x, SCREEN_HEIGHT // 2 + 52 + shake_y))
+            self.blit(high_score_text, (SCREEN_WIDTH // 2 - 70 + shake_x, SCREEN_HEIGHT // 2 + 50 + shake_y))
             
             # New record notification
             if self.new_record:
-                record_text = self.font.render("NEW RECORD!", True, GOLD)
-                self.screen.blit(record_text, (SCREEN_WIDTH // 2 - 100 + shake_x, SCREEN_HEIGHT // 2 + 90 + shake_y))
+                record_text = self.text.render(self.font, "NEW RECORD!", GOLD)
+                self.blit(record_text, (SCREEN_WIDTH // 2 - 100 + shake_x, SCREEN_HEIGHT // 2 + 90 + shake_y))
             
-            self.screen.blit(restart_shadow, (SCREEN_WIDTH // 2 - 148 + shake_x, SCREEN_HEIGHT // 2 + 130 + shake_y))
-            self.screen.blit(restart_text, (SCREEN_WIDTH // 2 - 150 + shake_x, SCREEN_HEIGHT // 2 + 128 + shake_y))
+            self.blit(restart_shadow, (SCREEN_WIDTH // 2 - 148 + shake_x, SCREEN_HEIGHT // 2 + 130 + shake_y))
+            self.blit(restart_text, (SCREEN_WIDTH // 2 - 150 + shake_x, SCREEN_HEIGHT // 2 + 128 + shake_y))
+    
+    def present(self):
+        if self.profiler is not None and self.profiler.overlay:
+            self.mark_dirty(self.profiler.draw_overlay(self.screen))
         
-        pygame.display.flip()
+        if self.offscreen:
+            return
+        if self.dirty is None:
+            pygame.display.flip()
+            return
+        
+        if self.full_frame:
+            pygame.display.flip()
+        else:
+            # Areas cleared from last frame have to reach the display too
+            pygame.display.update(self.last_dirty + self.dirty)
+        self.last_dirty = self.dirty
+    
+    def run_headless(self, policy=None, max_steps=None):
+        """Step the game as fast as possible until game over, returns steps taken"""
+        steps = 0
+        while not self.game_over and (max_steps is None or steps < max_steps):
+            if policy is not None and policy(self):
+                self.bird.jump()
+            self.update_physics()
+            steps += 1
+        return steps
     
     def run(self):
+        if self.headless:
+            return self.run_headless()
+        
+        # Fixed timestep: the simulation always advances in SIM_DT ticks, however
+        # fast frames are drawn, and the frame shows the state between two ticks
         running = True
+        accumulator = 0.0
+        frame_time = SIM_DT
         while running:
             running = self.handle_events()
-            self.update()
-            self.draw()
-            self.clock.tick(FPS)
+            accumulator += min(frame_time, MAX_FRAME_TIME) * self.time_scale
+            while accumulator >= SIM_DT:
+                if self.controller is not None and self.controller(self):
+                    self.bird.jump()
+                self.update()
+                accumulator -= SIM_DT
+            self.draw(accumulator / SIM_DT)
+            frame_time = self.clock.tick(FPS) / 1000
         
-        pygame.quit()
+        try:
+            self.close()
+        finally:
+            pygame.quit()
         sys.exit()
 
 if __name__ == "__main__":
-    game = Game()
+    game = Game(dirty_rects='--dirty-rects' in sys.argv)
     game.run()
 
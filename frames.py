@@ -0,0 +1,138 @@
+import os
+
+# Importing should print nothing, set before pygame is imported
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import numpy as np
+import pygame
+
+from flappy_bird import Game
+
+
+def _rgb_view(raw, surface):
+    """(height, width, 3) uint8 view of the red, green and blue bytes of raw 32-bit pixels"""
+    if surface.get_bytesize() != 4:
+        raise ValueError("frame capture needs a 32-bit screen")
+    offsets = []
+    for mask in surface.get_masks()[:3]:
+        byte = (mask.bit_length() - 1) // 8
+        offsets.append(byte if np.little_endian else 3 - byte)
+    red, green, blue = offsets
+    step = green - red
+    if step not in (1, -1) or blue - green != step:
+        raise ValueError(f"unsupported pixel format, channel masks {surface.get_masks()[:3]}")
+    end = red + 3 * step
+    return raw.view(np.uint8).reshape(raw.shape + (4,))[..., red:end if end >= 0 else None:step]
+
+
+class FrameCapture:
+    """Pixel observations of an offscreen Game, as NumPy views of its pixels.
+
+    Frames are (height, width, 3) RGB, or (height, width) with grayscale,
+    uint8 either way. With size=(width, height) the frame is first scaled
+    down into a surface allocated once, and grayscale is converted into
+    another; the view of the last of them is taken once and only ever
+    refilled, so a frame costs one render and no allocations.
+
+    Without scaling or grayscale the screen's raw 32-bit pixels are copied
+    row by row into a (height, width) buffer owned by the capture, and the
+    frame is a uint8 view of that buffer picking out the red, green and blue
+    bytes by the screen's channel masks. A view keeps its surface locked, and
+    pygame cannot blit onto a locked surface. So the screen is only viewed for
+    that one copy, and frames handed out never stop the game from drawing.
+
+    Offscreen games never open a window, so no display or video driver is
+    needed.
+
+    With stack above 1 observations are the last stack frames, oldest first,
+    copied into a preallocated ring buffer. Every frame is written twice,
+    stack slots apart, so the window of the last frames is always one
+    contiguous slice and reading it copies nothing.
+    """
+
+    def __init__(self, game=None, size=None, grayscale=False, stack=1):
+        if game is None:
+            game = Game(offscreen=True)
+        if game.screen is None:
+            raise ValueError("headless games draw nothing, use Game(offscreen=True)")
+        self.game = game
+        self.size = size
+        self.grayscale = grayscale
+        self.stack = stack
+
+        screen = game.screen
+        self.scaled = pygame.Surface(size, 0, screen) if size is not None else None
+        source = self.scaled or screen
+        self.gray = pygame.Surface(source.get_size(), 0, source) if grayscale else None
+
+        width, height = source.get_size()
+        self.shape = (height, width) if grayscale else (height, width, 3)
+        # Nothing to convert, the screen gets copied into a buffer of our own
+        self.copy_screen = self.gray is None and self.scaled is None
+
+        # Red, green and blue are equal after grayscale, the red channel alone is the frame
+        if self.gray is not None:
+            self.view = pygame.surfarray.pixels_red(self.gray).T
+        elif self.scaled is not None:
+            self.view = pygame.surfarray.pixels3d(self.scaled).transpose(1, 0, 2)
+        else:
+            self.raw = np.zeros((height, width), dtype=np.uint32)
+            self.view = _rgb_view(self.raw, screen)
+        if stack > 1:
+            self.frames = np.zeros((2 * stack,) + self.shape, dtype=np.uint8)
+            self.head = 0
+        else:
+            self.frames = None
+
+    def frame(self):
+        """The last drawn frame, converted, in a buffer the capture owns"""
+        source = self.game.screen
+        if self.copy_screen:
+            pixels = pygame.surfarray.pixels2d(source)
+            np.copyto(self.raw, pixels.T)
+            # Unlocks the screen for the next draw
+            del pixels
+            return self.view
+
+        if self.scaled is not None:
+            pygame.transform.smoothscale(source, self.size, self.scaled)
+            source = self.scaled
+        if self.gray is not None:
+            pygame.transform.grayscale(source, self.gray)
+        return self.view
+
+    def push(self):
+        """Add the last drawn frame to the stack, returns the observation"""
+        if self.frames is None:
+            return self.frame()
+
+        frame = self.frame()
+        head = self.head
+        self.frames[head] = frame
+        self.frames[head + self.stack] = frame
+        del frame
+        self.head = head = (head + 1) % self.stack
+        return self.frames[head:head + self.stack]
+
+    def capture(self, alpha=1.0):
+        """Draw the game and return the observation"""
+        self.game.draw(alpha)
+        return self.push()
+
+    def reset(self, seed=None):
+        """Reset the game, returns the first observation with every stack slot holding the first frame"""
+        self.game.reset(seed)
+        self.game.draw()
+        if self.frames is None:
+            return self.frame()
+
+        frame = self.frame()
+        self.frames[:] = frame
+        del frame
+        self.head = 0
+        return self.frames[:self.stack]
+
+    def step(self, action):
+        """Game.step, with the observation replaced by the captured frames"""
+        _, reward, done = self.game.step(action)
+        return self.capture(), reward, done
@@ -0,0 +1,379 @@
+import argparse
+import asyncio
+import multiprocessing
+import threading
+import time
+
+import numpy as np
+
+from flappy_bird import Game, OBS_SIZE, SIM_DT
+from profiler import StageTimes
+from rollout import gap_policy
+
+# How long a tick may wait for the action answering its own observation
+DEFAULT_LATENCY_BUDGET = 0.004
+
+
+class BatchedPolicy:
+    """Turns a policy(observation) -> bool into a policy over a batch of observations.
+
+    A class rather than a closure so it can be pickled for ProcessPolicyBridge.
+    """
+
+    def __init__(self, policy):
+        self.policy = policy
+
+    def __call__(self, observations):
+        return [self.policy(obs) for obs in observations]
+
+
+class PolicyBridge:
+    """Runs a policy off the game loop, on a worker thread.
+
+    Games publish their observation every tick into their own slot. The
+    worker takes the latest observation of every game that published one
+    since its last pass, calls policy(observations) once on the whole
+    (n, obs_size) batch and hands back one action per game. An observation
+    published while the policy is busy replaces the one still waiting, so
+    the worker never falls further behind than one call.
+
+    take() waits at most latency_budget seconds for the action answering the
+    tick's own observation, then applies the most recent action delivered,
+    if any. Every action is applied once. A policy error is raised from the
+    next take() or close().
+
+    Subclasses run the policy elsewhere by overriding _start, _stop and
+    _infer.
+    """
+
+    def __init__(self, policy, games=1, latency_budget=DEFAULT_LATENCY_BUDGET, obs_size=OBS_SIZE):
+        self.policy = policy
+        self.games = games
+        self.latency_budget = latency_budget
+        self.error = None
+        self.closed = False
+        self.cond = threading.Condition()
+
+        self.observations = np.zeros((games, obs_size), dtype=np.float32)
+        self.ticks = [-1] * games
+        self.published = [0.0] * games
+        # Games with an observation the worker has not taken yet
+        self.pending = set()
+        # Latest action delivered and not applied yet per game, as (tick, action, latency)
+        self.actions = [None] * games
+        self._start()
+
+    def publish(self, game, observation, tick):
+        """Offer the observation of a game at a tick to the policy"""
+        with self.cond:
+            self.observations[game] = observation
+            self.ticks[game] = tick
+            self.published[game] = time.perf_counter()
+            self.pending.add(game)
+            self.cond.notify_all()
+        self._notify()
+
+    def take(self, game, tick):
+        """The action to apply at a tick, returns (action, latency in seconds).
+
+        latency is how long the policy took to answer the observation the
+        action came from, None when no action arrived at all.
+        """
+        deadline = time.perf_counter() + self.latency_budget
+        with self.cond:
+            while self.error is None and not self._answered(game, tick):
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self.cond.wait(remaining)
+            self._raise_error()
+            result = self.actions[game]
+            self.actions[game] = None
+        if result is None:
+            return False, None
+        _, action, latency = result
+        return action, latency
+
+    def _answered(self, game, tick):
+        result = self.actions[game]
+        return result is not None and result[0] >= tick
+
+    def _next_batch(self, block=True):
+        """Take the waiting observations, as (games, observations, ticks, published), None once closed"""
+        with self.cond:
+            while block and not self.pending and not self.closed:
+                self.cond.wait()
+            if self.closed:
+                return None
+            games = sorted(self.pending)
+            self.pending.clear()
+            return (games, self.observations[games],
+                    [self.ticks[g] for g in games], [self.published[g] for g in games])
+
+    def _deliver(self, batch, actions):
+        games, _, ticks, published = batch
+        now = time.perf_counter()
+        with self.cond:
+            for game, tick, start, action in zip(games, ticks, published, actions):
+                self.actions[game] = (tick, bool(action), now - start)
+            self.cond.notify_all()
+
+    def _fail(self, error):
+        with self.cond:
+            self.error = error
+            self.cond.notify_all()
+
+    def _raise_error(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def _serve(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                self._deliver(batch, self._infer(batch[1]))
+            except Exception as e:
+                self._fail(e)
+
+    def _infer(self, observations):
+        return self.policy(observations)
+
+    def _start(self):
+        self.thread = threading.Thread(target=self._serve, name=f"{type(self).__name__} worker", daemon=True)
+        self.thread.start()
+
+    def _notify(self):
+        """Hook for workers that are not waiting on the condition"""
+
+    def _stop(self):
+        self.thread.join()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        self._notify()
+        self._stop()
+        self._raise_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _serve_process(conn, policy):
+    while True:
+        observations = conn.recv()
+        if observations is None:
+            return
+        try:
+            conn.send([bool(action) for action in policy(observations)])
+        except Exception as e:
+            conn.send(e)
+
+
+class ProcessPolicyBridge(PolicyBridge):
+    """PolicyBridge calling the policy in a child process, so inference never holds the game's GIL.
+
+    The policy has to be picklable, e.g. a module level function or a
+    BatchedPolicy of one.
+    """
+
+    def _start(self):
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_serve_process, args=(child_conn, self.policy), daemon=True)
+        self.process.start()
+        child_conn.close()
+        super()._start()
+
+    def _infer(self, observations):
+        self.conn.send(observations)
+        result = self.conn.recv()
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def _stop(self):
+        super()._stop()
+        self.conn.send(None)
+        self.process.join()
+        self.conn.close()
+
+
+class AsyncPolicyBridge(PolicyBridge):
+    """PolicyBridge awaiting an async policy(observations) as an asyncio task.
+
+    The task runs on the given event loop, which must be running in another
+    thread, e.g. one that also talks to a model server. Without a loop the
+    bridge runs its own on a worker thread.
+    """
+
+    def __init__(self, policy, games=1, latency_budget=DEFAULT_LATENCY_BUDGET, obs_size=OBS_SIZE, loop=None):
+        self.loop = loop
+        self.event = asyncio.Event()
+        super().__init__(policy, games, latency_budget, obs_size)
+
+    async def serve(self):
+        while True:
+            await self.event.wait()
+            self.event.clear()
+            batch = self._next_batch(block=False)
+            if batch is None:
+                return
+            if not batch[0]:
+                continue
+            try:
+                self._deliver(batch, await self.policy(batch[1]))
+            except Exception as e:
+                self._fail(e)
+
+    def _start(self):
+        if self.loop is None:
+            self.loop = asyncio.new_event_loop()
+            self.thread = threading.Thread(target=self.loop.run_until_complete, args=(self.serve(),),
+                                           name=f"{type(self).__name__} loop", daemon=True)
+            self.thread.start()
+            self.task = None
+        else:
+            self.thread = None
+            self.task = asyncio.run_coroutine_threadsafe(self.serve(), self.loop)
+
+    def _notify(self):
+        self.loop.call_soon_threadsafe(self.event.set)
+
+    def _stop(self):
+        if self.thread is not None:
+            self.thread.join()
+            self.loop.close()
+        else:
+            self.task.result()
+
+
+class BridgeController:
+    """Plays a Game through a PolicyBridge slot instead of the keyboard.
+
+    As game.controller it is called before every tick of Game.run; step()
+    does the same for a loop driven by hand. The policy latency of every
+    applied action is kept over a rolling window, like profiler stages.
+    """
+
+    def __init__(self, bridge, slot=0, window=240):
+        self.bridge = bridge
+        self.slot = slot
+        self.tick = 0
+        self.latency = None
+        self.latencies = StageTimes(window)
+        # Ticks that got no action in time
+        self.misses = 0
+
+    def __call__(self, game):
+        """The action for the game's next tick"""
+        if game.game_over:
+            return False
+        self.publish(game)
+        return self.act()
+
+    def publish(self, game):
+        game.write_observation()
+        self.bridge.publish(self.slot, game.observation, self.tick)
+
+    def act(self):
+        """The action answering the last published observation, or the latest one in time"""
+        action, self.latency = self.bridge.take(self.slot, self.tick)
+        self.tick += 1
+        if self.latency is None:
+            self.misses += 1
+        else:
+            self.latencies.add(int(self.latency * 1e9))
+        return action
+
+    def step(self, game):
+        """Game.step with the bridged policy's action, returns (observation, reward, done, latency)"""
+        action = self(game)
+        obs, reward, done = game.step(action)
+        return obs, reward, done, self.latency
+
+    def stats(self):
+        return dict(self.latencies.stats(), misses=self.misses)
+
+
+class SlowPolicy:
+    """Batched policy that takes at least delay seconds, standing in for a model"""
+
+    def __init__(self, policy, delay):
+        self.policy = BatchedPolicy(policy)
+        self.delay = delay
+
+    def __call__(self, observations):
+        time.sleep(self.delay)
+        return self.policy(observations)
+
+
+class AsyncSlowPolicy(SlowPolicy):
+    async def __call__(self, observations):
+        await asyncio.sleep(self.delay)
+        return self.policy(observations)
+
+
+BRIDGES = {
+    'thread': (PolicyBridge, SlowPolicy),
+    'process': (ProcessPolicyBridge, SlowPolicy),
+    'async': (AsyncPolicyBridge, AsyncSlowPolicy),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Let a policy play without blocking the game loop")
+    parser.add_argument('--worker', choices=BRIDGES, default='thread', help="where the policy runs")
+    parser.add_argument('--delay-ms', type=float, default=10.0, help="simulated inference time per call")
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_LATENCY_BUDGET * 1000,
+                        help="how long a tick waits for its action")
+    parser.add_argument('--games', type=int, default=1, help="headless games sharing the policy")
+    parser.add_argument('--headless', action='store_true', help="play headless games and print latencies")
+    parser.add_argument('--max-steps', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    bridge_class, policy_class = BRIDGES[args.worker]
+    policy = policy_class(gap_policy, args.delay_ms / 1000)
+    games = args.games if args.headless else 1
+    with bridge_class(policy, games, args.budget_ms / 1000) as bridge:
+        controllers = [BridgeController(bridge, slot) for slot in range(games)]
+        if not args.headless:
+            # The policy's games must not land in the player's high score file
+            game = Game(controller=controllers[0], high_score_file=None)
+            game.reset(args.seed)
+            game.run()
+            return
+
+        envs = [Game(headless=True) for _ in range(games)]
+        for i, game in enumerate(envs):
+            game.reset(args.seed + i)
+        start = time.perf_counter()
+        for _ in range(args.max_steps):
+            playing = [(controller, game) for controller, game in zip(controllers, envs) if not game.game_over]
+            if not playing:
+                break
+            tick_start = time.perf_counter()
+            # Every game publishes before any waits, so the worker can batch them
+            for controller, game in playing:
+                controller.publish(game)
+            for controller, game in playing:
+                game.step(controller.act())
+            time.sleep(max(0.0, SIM_DT - (time.perf_counter() - tick_start)))
+        elapsed = time.perf_counter() - start
+
+    print(f"{games} games, {max(c.tick for c in controllers)} ticks in {elapsed:.2f}s")
+    for controller, game in zip(controllers, envs):
+        stats = controller.stats()
+        print(f"slot {controller.slot}: score {game.score}, latency p50 {stats['p50_ms']:.2f} ms, "
+              f"p95 {stats['p95_ms']:.2f} ms, missed {stats['misses']} ticks")
+
+
+if __name__ == "__main__":
+    main()
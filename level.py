@@ -0,0 +1,132 @@
+from collections import namedtuple
+
+import numpy as np
+
+from batch_env import (PIPE_GAP, PIPE_SPEED, PIPE_MIN_TOP, PIPE_MAX_TOP, PIPE_SPACING, PIPE_WIDTH,
+                       POWER_UP_SIZE, POWER_UP_MIN_Y, POWER_UP_MAX_Y)
+
+POWER_UP_TYPES = ('shield', 'magnet', 'double')
+
+# A power-up sits halfway between its pipe and the next one, this far right of its pipe's x
+POWER_UP_OFFSET = PIPE_WIDTH + (PIPE_SPACING - PIPE_WIDTH) // 2 - POWER_UP_SIZE // 2
+
+# Segments generated per chunk, each chunk from its own seeded generator
+CHUNK_SIZE = 256
+
+# One pipe of a level, with the power-up following it; power_up is None or (type, y)
+Segment = namedtuple('Segment', ['index', 'top_height', 'gap', 'speed', 'power_up'])
+
+
+class Difficulty(namedtuple('Difficulty', ['gap_start', 'gap_end', 'gap_pipes',
+                                           'speed_start', 'speed_end', 'speed_every', 'power_up_chance'])):
+    """How a level gets harder with every pipe.
+
+    The gap shrinks linearly from gap_start to gap_end over the first
+    gap_pipes pipes, and the scroll speed goes up by one every speed_every
+    pipes from speed_start until speed_end. Every pipe is followed by a
+    power-up with probability power_up_chance. The defaults are the
+    original game's constant gap and speed.
+    """
+    __slots__ = ()
+
+    def __new__(cls, gap_start=PIPE_GAP, gap_end=PIPE_GAP, gap_pipes=1,
+                speed_start=PIPE_SPEED, speed_end=PIPE_SPEED, speed_every=1, power_up_chance=0.5):
+        return super().__new__(cls, gap_start, gap_end, gap_pipes,
+                               speed_start, speed_end, speed_every, power_up_chance)
+
+    def gap(self, index):
+        progress = np.minimum(index / self.gap_pipes, 1.0)
+        return np.rint(self.gap_start + (self.gap_end - self.gap_start) * progress).astype(np.int64)
+
+    def speed(self, index):
+        return np.minimum(self.speed_start + index // self.speed_every, self.speed_end)
+
+
+# Gap from 200 down to 140 over 100 pipes, speed from 3 up to 5 every 25 pipes
+RAMP = Difficulty(gap_end=140, gap_pipes=100, speed_end=5, speed_every=25)
+
+
+class LevelGenerator:
+    """Seeded, endless schedule of pipe gaps and power-up slots.
+
+    Segments are produced lazily, CHUNK_SIZE at a time, and every chunk has
+    its own generator seeded from (seed, chunk), so any stretch of a level
+    can be produced without producing what comes before it and the result
+    does not depend on the order segments were asked for. Games only keep
+    an index into the level, so one generator can be shared by any number
+    of games and birds, which then all fly the same level.
+
+    Power-up positions are precomputed: a power-up is centered between its
+    pipe and the next one, clear of both, at the height of its pipe's gap
+    center (clipped to the range the game spawns power-ups in).
+    """
+
+    power_up_offset = POWER_UP_OFFSET
+
+    def __init__(self, seed=0, difficulty=Difficulty()):
+        self.seed = seed
+        self.difficulty = difficulty
+        self.chunks = {}
+
+    def _chunk(self, chunk):
+        arrays = self.chunks.get(chunk)
+        if arrays is None:
+            arrays = self.chunks[chunk] = self._generate(chunk)
+        return arrays
+
+    def _generate(self, chunk):
+        rng = np.random.default_rng([self.seed, chunk])
+        index = np.arange(chunk * CHUNK_SIZE, (chunk + 1) * CHUNK_SIZE)
+        difficulty = self.difficulty
+        gap = difficulty.gap(index)
+        top = rng.integers(PIPE_MIN_TOP, PIPE_MAX_TOP + 1, CHUNK_SIZE)
+        power_up = np.where(rng.random(CHUNK_SIZE) < difficulty.power_up_chance,
+                            rng.integers(0, len(POWER_UP_TYPES), CHUNK_SIZE), -1)
+        power_up_y = np.clip(top + gap // 2 - POWER_UP_SIZE // 2, POWER_UP_MIN_Y, POWER_UP_MAX_Y)
+        return (top.astype(np.int16), gap.astype(np.int16), difficulty.speed(index).astype(np.int16),
+                power_up.astype(np.int8), power_up_y.astype(np.int16))
+
+    def pipe(self, index):
+        """(top_height, gap, speed) of the index-th pipe"""
+        top, gap, speed, _, _ = self._chunk(index // CHUNK_SIZE)
+        i = index % CHUNK_SIZE
+        return int(top[i]), int(gap[i]), int(speed[i])
+
+    def power_up(self, index):
+        """(type, y) of the power-up after the index-th pipe, None if there is none"""
+        _, _, _, power_up, power_up_y = self._chunk(index // CHUNK_SIZE)
+        i = index % CHUNK_SIZE
+        if power_up[i] < 0:
+            return None
+        return POWER_UP_TYPES[power_up[i]], int(power_up_y[i])
+
+    def segment(self, index):
+        return Segment(index, *self.pipe(index), self.power_up(index))
+
+    def lookahead(self, index, count):
+        """The count segments from index on, e.g. the pipes a planner will meet next"""
+        return [self.segment(i) for i in range(index, index + count)]
+
+    def stream(self, start=0):
+        """Every segment from start on, produced as they are iterated"""
+        index = start
+        while True:
+            yield self.segment(index)
+            index += 1
+
+    def arrays(self, start, stop):
+        """Segments [start, stop) as arrays top_height, gap, speed, power_up (type index or -1), power_up_y"""
+        first, last = start // CHUNK_SIZE, (stop - 1) // CHUNK_SIZE
+        chunks = [self._chunk(chunk) for chunk in range(first, last + 1)]
+        offset = first * CHUNK_SIZE
+        return tuple(np.concatenate(columns)[start - offset:stop - offset] for columns in zip(*chunks))
+
+
+def generate_levels(seeds, length, difficulty=Difficulty()):
+    """The first length segments of the level of every seed, without running a game.
+
+    Returns arrays of shape (len(seeds), length): top_height, gap, speed,
+    power_up (type index or -1) and power_up_y, e.g. to sort a curriculum.
+    """
+    levels = [LevelGenerator(seed, difficulty).arrays(0, length) for seed in seeds]
+    return tuple(np.stack(columns) for columns in zip(*levels))
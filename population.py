@@ -0,0 +1,266 @@
+import argparse
+import time
+
+import numpy as np
+
+from batch_env import (BIRD_X, BIRD_START_Y, BIRD_WIDTH, BIRD_HEIGHT, GRAVITY, JUMP_STRENGTH, MAGNET_PULL,
+                       GROUND_Y, POWER_UP_SIZE, round_rect_coord)
+from flappy_bird import Game, WHITE, OBS_SIZE, BIRD_MAX_ANGLE, get_bird_atlas
+
+# Power-up type to (timer array attribute, duration in ticks), as in Game.update_power_ups
+POWER_UP_EFFECTS = {
+    'shield': ('shield_timer', 600),
+    'magnet': ('magnet_timer', 1200),
+    'double': ('double_points_timer', 1800),
+}
+
+
+class PopulationGame(Game):
+    """Many birds flying through one shared world.
+
+    Pipes and power-ups are simulated once for the whole population, the birds
+    are NumPy arrays updated and collision-tested together, following
+    Bird.update and Game.update_pipes, and drawn from the shared BirdAtlas.
+    Every bird keeps its own score, power-up timers and the tick it died on.
+    A power-up is not used up by the first bird to reach it, each bird can
+    take it once.
+
+    Observations are a (size, OBS_SIZE) array with one Game observation per
+    bird. The game is over once every bird is dead; score is the best bird's.
+    """
+
+    def __init__(self, size, policy=None, **kwargs):
+        self.size = size
+        # Optional policy(observations) -> bool array, applied every tick by update()
+        self.policy = policy
+        self.observations = np.zeros((size, OBS_SIZE), dtype=np.float32)
+
+        self.y = np.zeros(size)
+        self.prev_y = np.zeros(size)
+        self.velocity = np.zeros(size)
+        self.wing_flap = np.zeros(size)
+        self.rect_y = np.zeros(size, dtype=np.int64)
+        self.alive = np.zeros(size, dtype=bool)
+        # Birds alive at the start of the tick, they still score a pipe passed on their death tick
+        self.scoring = np.zeros(size, dtype=bool)
+        self.scores = np.zeros(size, dtype=np.int64)
+        self.death_frames = np.zeros(size, dtype=np.int64)
+        self.shield_timer = np.zeros(size, dtype=np.int64)
+        self.magnet_timer = np.zeros(size, dtype=np.int64)
+        self.double_points_timer = np.zeros(size, dtype=np.int64)
+        # Birds that already took the power-up currently crossing their column
+        self.taken = np.zeros(size, dtype=bool)
+        self.taking = None
+
+        kwargs.setdefault('high_score_file', None)
+        super().__init__(**kwargs)
+
+    def reset(self, seed=None):
+        self.y[:] = BIRD_START_Y
+        self.prev_y[:] = BIRD_START_Y
+        self.velocity[:] = 0
+        self.wing_flap[:] = 0
+        self.rect_y[:] = BIRD_START_Y
+        self.alive[:] = True
+        self.scoring[:] = True
+        self.scores[:] = 0
+        self.death_frames[:] = -1
+        self.shield_timer[:] = 0
+        self.magnet_timer[:] = 0
+        self.double_points_timer[:] = 0
+        self.taken[:] = False
+        self.taking = None
+        self.frame = 0
+        super().reset(seed)
+        return self.observations
+
+    def apply_actions(self, actions):
+        """Make the live birds selected by a boolean array jump"""
+        jumps = np.asarray(actions, dtype=bool) & self.alive
+        self.velocity[jumps] = JUMP_STRENGTH
+        self.wing_flap[jumps] = 10
+
+    def step(self, actions):
+        """Jump where actions is True and advance one tick, returns (observations, rewards, dones)"""
+        if self.game_over:
+            return self.observations, np.zeros(self.size, dtype=np.int64), ~self.alive
+        self.apply_actions(actions)
+        old_scores = self.scores.copy()
+        super().update()
+        self.write_observation()
+        return self.observations, self.scores - old_scores, ~self.alive
+
+    def update(self):
+        if self.policy is not None and not self.game_over:
+            self.apply_actions(self.policy(self.observations))
+        super().update()
+        self.write_observation()
+
+    def evaluate(self, policy, seed=None, max_steps=None):
+        """Play one generation until every bird is dead, returns (scores, death_frames).
+
+        Birds still alive after max_steps keep a death frame of -1.
+        """
+        obs = self.reset(seed)
+        steps = 0
+        while not self.game_over and (max_steps is None or steps < max_steps):
+            obs, rewards, dones = self.step(policy(obs))
+            steps += 1
+        return self.scores.copy(), self.death_frames.copy()
+
+    def kill(self, dead):
+        self.alive &= ~dead
+        self.death_frames[dead] = self.frame
+        if not self.alive.any():
+            self.game_over = True
+
+    def write_observation(self):
+        obs = self.observations
+        obs[:, 0] = self.y
+        obs[:, 1] = self.velocity
+        for pipe in self.pipes:
+            if pipe.x + pipe.width >= BIRD_X:
+                obs[:, 2] = pipe.x
+                obs[:, 3] = pipe.top_height
+                obs[:, 4] = pipe.bottom_y
+                break
+        obs[:, 5] = self.shield_timer
+        obs[:, 6] = self.magnet_timer
+        obs[:, 7] = self.double_points_timer
+
+    def update_power_ups(self):
+        self.maybe_spawn_power_up()
+
+        for pu in self.power_ups:
+            pu.prev_x = pu.x
+            pu.x -= self.scroll_speed
+            pu.rect.x = pu.x
+            pu.update()
+
+        # Power-ups are far apart, so at most one crosses the birds' column at a time
+        crossing = None
+        for pu in self.power_ups:
+            if BIRD_X < pu.x + POWER_UP_SIZE and pu.x < BIRD_X + BIRD_WIDTH:
+                crossing = pu
+                break
+        if crossing is not self.taking:
+            self.taking = crossing
+            self.taken[:] = False
+        if crossing is not None:
+            # Tested against the birds' rects of the previous tick, like Game.update_power_ups
+            hit = (self.alive & ~self.taken &
+                   (self.rect_y < crossing.y + POWER_UP_SIZE) & (crossing.y < self.rect_y + BIRD_HEIGHT))
+            if hit.any():
+                timer, duration = POWER_UP_EFFECTS[crossing.type]
+                getattr(self, timer)[hit] = duration
+                self.taken |= hit
+
+        while self.power_ups and self.power_ups[0].x <= -50:
+            self.power_up_pool.append(self.power_ups.pop(0))
+
+    def update_bird(self):
+        self.frame += 1
+        alive = self.alive
+        self.scoring[:] = alive
+        for timer in (self.shield_timer, self.magnet_timer, self.double_points_timer):
+            timer -= (timer > 0) & alive
+
+        self.prev_y[alive] = self.y[alive]
+        self.velocity[alive] += GRAVITY
+        self.y[alive] += self.velocity[alive]
+        self.velocity[alive & (self.magnet_timer > 0)] *= MAGNET_PULL
+        self.rect_y[alive] = round_rect_coord(self.y[alive])
+        self.wing_flap[alive] = np.maximum(0, self.wing_flap[alive] - 0.5)
+
+        self.kill(alive & ((self.y < 0) | (self.y + BIRD_HEIGHT > GROUND_Y)))
+
+    def update_pipes(self):
+        for pipe in self.pipes:
+            pipe.update()
+
+            if pipe.x + pipe.width < BIRD_X and not pipe.scored:
+                pipe.scored = True
+                points = np.where(self.double_points_timer > 0, 2, 1)
+                self.scores[self.scoring] += points[self.scoring]
+                self.score = int(self.scores.max())
+                gap_center_y = pipe.top_height + (pipe.bottom_y - pipe.top_height) // 2
+                self.create_star_particles(pipe.x + pipe.width // 2, gap_center_y)
+
+        # Every bird shares the same x, so the broad phase is the same as for one bird
+        while self.pipes[self.next_pipe].x + self.pipes[self.next_pipe].width + 5 <= BIRD_X:
+            self.next_pipe += 1
+        pipe = self.pipes[self.next_pipe]
+        if pipe.overlaps_x(BIRD_X, BIRD_X + BIRD_WIDTH):
+            top = self.rect_y
+            bottom = self.rect_y + BIRD_HEIGHT
+            hit = np.zeros(self.size, dtype=bool)
+            for rect in pipe.get_collision_rects():
+                if BIRD_X < rect.right and rect.left < BIRD_X + BIRD_WIDTH:
+                    hit |= (top < rect.bottom) & (rect.top < bottom)
+            self.kill(self.alive & hit & (self.shield_timer == 0))
+
+        self.recycle_pipes()
+
+    def draw_bird(self):
+        alive = np.flatnonzero(self.alive)
+        if len(alive) == 0:
+            return
+        y = self.prev_y[alive] + (self.y[alive] - self.prev_y[alive]) * self.alpha
+        angle = np.clip(-self.velocity[alive] * 3, -BIRD_MAX_ANGLE, BIRD_MAX_ANGLE)
+        center_x = BIRD_X + BIRD_WIDTH // 2
+        center_y = (y + BIRD_HEIGHT // 2).astype(np.int64)
+
+        atlas = get_bird_atlas()
+        blits = []
+        shield_x, shield_y = atlas.shield_offset
+        for cy in center_y[self.shield_timer[alive] > 0].tolist():
+            blits.append((atlas.shield, (center_x + shield_x, cy + shield_y)))
+        for flap, a, cy in zip(self.wing_flap[alive].tolist(), angle.tolist(), center_y.tolist()):
+            sprite, (offset_x, offset_y) = atlas.get(flap, a)
+            blits.append((sprite, (center_x + offset_x, cy + offset_y)))
+        rects = self.screen.blits(blits)
+        self.mark_dirty(rects[0].unionall(rects))
+
+    def draw_hud(self):
+        super().draw_hud()
+        if not self.game_over:
+            alive = self.text.render(self.small_font, f"Alive: {int(self.alive.sum())}/{self.size}", WHITE)
+            self.blit(alive, (10, 10))
+
+
+def noisy_gap_policy(size, seed=None, spread=40):
+    """Vectorized rollout.gap_policy where every bird aims at its own offset from the gap center"""
+    offsets = np.random.default_rng(seed).normal(0, spread, size)
+
+    def policy(obs):
+        gap_center = (obs[:, 3] + obs[:, 4]) / 2 + offsets
+        return (obs[:, 1] > 0) & (obs[:, 0] > gap_center)
+    return policy
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fly a population of birds through one world")
+    parser.add_argument('--size', type=int, default=200, help="number of birds")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--headless', action='store_true', help="evaluate one generation and print the results")
+    parser.add_argument('--max-steps', type=int, default=20000)
+    args = parser.parse_args()
+
+    policy = noisy_gap_policy(args.size, args.seed)
+    if args.headless:
+        game = PopulationGame(args.size, headless=True)
+        start = time.perf_counter()
+        scores, death_frames = game.evaluate(policy, args.seed, args.max_steps)
+        elapsed = time.perf_counter() - start
+        print(f"{args.size} birds, {game.frame} ticks in {elapsed:.2f}s "
+              f"({game.frame * args.size / elapsed:.0f} bird-steps/s)")
+        print(f"Best score: {scores.max()}, mean: {scores.mean():.2f}, "
+              f"still alive: {int((death_frames < 0).sum())}")
+    else:
+        game = PopulationGame(args.size, policy=policy)
+        game.reset(args.seed)
+        game.run()
+
+
+if __name__ == "__main__":
+    main()
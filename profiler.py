@@ -0,0 +1,151 @@
+import json
+import time
+from array import array
+
+import pygame
+
+# Histogram bucket upper bounds in milliseconds, the last bucket is open ended
+HISTOGRAM_BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 16)
+
+OVERLAY_REFRESH_FRAMES = 15
+
+
+class StageTimes:
+    """Ring buffer of the last window timings of one stage, in nanoseconds"""
+
+    def __init__(self, window):
+        self.samples = array('q', bytes(8 * window))
+        self.window = window
+        self.index = 0
+        self.count = 0
+
+    def add(self, ns):
+        self.samples[self.index] = ns
+        self.index = (self.index + 1) % self.window
+        if self.count < self.window:
+            self.count += 1
+
+    def values(self):
+        return sorted(self.samples[:self.count])
+
+    def stats(self):
+        values = self.values()
+        if not values:
+            return {'mean_ms': 0.0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0, 'samples': 0}
+        n = len(values)
+        return {
+            'mean_ms': sum(values) / n / 1e6,
+            'p50_ms': values[n * 50 // 100] / 1e6,
+            'p95_ms': values[min(n - 1, n * 95 // 100)] / 1e6,
+            'p99_ms': values[min(n - 1, n * 99 // 100)] / 1e6,
+            'max_ms': values[-1] / 1e6,
+            'samples': n,
+        }
+
+    def histogram(self):
+        """Sample counts per HISTOGRAM_BUCKETS_MS bucket, plus one overflow bucket"""
+        counts = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+        for ns in self.samples[:self.count]:
+            ms = ns / 1e6
+            for i, bound in enumerate(HISTOGRAM_BUCKETS_MS):
+                if ms <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+        return counts
+
+
+class FrameProfiler:
+    """Times the named update and draw stages of a Game.
+
+    Attach one as game.profiler; when it is None the game runs its stages
+    directly and pays nothing. Stats are kept over a rolling window of frames
+    and can be shown as an overlay (F3 in game), written to a JSON file or
+    pushed to a callback every export_every frames.
+    """
+
+    def __init__(self, window=240, callback=None, export_every=60, overlay=False):
+        self.window = window
+        self.callback = callback
+        self.export_every = export_every
+        self.overlay = overlay
+        self.groups = {}
+        self.frame = 0
+        self.font = None
+        self.overlay_surface = None
+
+    def run(self, group, stages):
+        """Run (name, method) stages in order, timing each one and the group as a whole"""
+        clock = time.perf_counter_ns
+        times = self.groups.get(group)
+        if times is None:
+            times = self.groups[group] = {}
+        start = clock()
+        for name, stage in stages:
+            t = clock()
+            stage()
+            elapsed = clock() - t
+            stage_times = times.get(name)
+            if stage_times is None:
+                stage_times = times[name] = StageTimes(self.window)
+            stage_times.add(elapsed)
+        total = times.get('total')
+        if total is None:
+            total = times['total'] = StageTimes(self.window)
+        total.add(clock() - start)
+
+    def end_frame(self):
+        self.frame += 1
+        if self.callback is not None and self.frame % self.export_every == 0:
+            self.callback(self.stats())
+
+    def stats(self):
+        return {group: {name: times.stats() for name, times in stages.items()}
+                for group, stages in self.groups.items()}
+
+    def histograms(self):
+        return {'buckets_ms': list(HISTOGRAM_BUCKETS_MS),
+                'stages': {group: {name: times.histogram() for name, times in stages.items()}
+                           for group, stages in self.groups.items()}}
+
+    def export(self, path):
+        """Write the current stats and histograms as JSON"""
+        with open(path, 'w') as f:
+            json.dump({'frame': self.frame, 'stats': self.stats(), 'histograms': self.histograms()}, f, indent=2)
+
+    def draw_overlay(self, screen):
+        # Text is re-rendered every few frames only, the overlay should not cost what it measures
+        if self.overlay_surface is None or self.frame % OVERLAY_REFRESH_FRAMES == 0:
+            self.overlay_surface = self.render_overlay()
+        return screen.blit(self.overlay_surface, (10, 100))
+
+    def render_overlay(self):
+        if self.font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            self.font = pygame.font.Font(None, 20)
+
+        lines = []
+        for group, stages in self.groups.items():
+            for name, times in stages.items():
+                stats = times.stats()
+                lines.append((f"{group}.{name}", stats['mean_ms'], stats['p95_ms']))
+
+        line_height = 16
+        width = 300
+        surface = pygame.Surface((width, line_height * (len(lines) + 1) + 8), pygame.SRCALPHA)
+        surface.fill((0, 0, 0, 160))
+        columns = (6, 170, 235)
+        rows = [("stage", "mean ms", "p95 ms")]
+        rows += [(name, f"{mean:.3f}", f"{p95:.3f}") for name, mean, p95 in lines]
+        for i, row in enumerate(rows):
+            y = 4 + line_height * i
+            if i > 0:
+                # Bar scaled so a full 60 FPS frame budget spans the panel
+                mean = lines[i - 1][1]
+                bar = min(width - 12, int((width - 12) * mean / (1000 / 60)))
+                pygame.draw.rect(surface, (0, 160, 255, 120), (6, y + 2, bar, line_height - 4))
+            for x, text in zip(columns, row):
+                surface.blit(self.font.render(text, True, (255, 255, 255)), (x, y))
+        return surface
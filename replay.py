@@ -0,0 +1,263 @@
+import argparse
+import os
+import random
+import struct
+from bisect import bisect_left
+
+import pygame
+
+from flappy_bird import Game, GameState
+
+MAGIC = b'FBRP'
+VERSION = 1
+
+# magic, version, seed, length in frames, final score, jumps, snapshots
+HEADER = struct.Struct('<4sBQIIII')
+SNAPSHOT_HEADER = struct.Struct('<II')
+
+# Snapshot payload layout, see Game.snapshot
+BIRD_STATE = struct.Struct('<5d?i?i?i?i')
+GAME_STATE = struct.Struct('<i?BiiBB')
+PIPE_STATE = struct.Struct('<iii?')
+POWER_UP_STATE = struct.Struct('<iiiBd')
+RNG_STATE = struct.Struct('<i625I?d')
+
+DEATH_CAUSES = (None, 'ceiling', 'ground', 'pipe')
+POWER_UP_TYPES = ('shield', 'magnet', 'double')
+
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, offset):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def pack_state(state):
+    """Serialize a GameState"""
+    version, internal, gauss_next = state.rng_state
+    parts = [
+        BIRD_STATE.pack(*state.bird),
+        GAME_STATE.pack(state.score, state.game_over, DEATH_CAUSES.index(state.death_cause), state.next_pipe,
+                        state.power_up_spawn_timer, len(state.pipes), len(state.power_ups)),
+    ]
+    parts += [PIPE_STATE.pack(*pipe) for pipe in state.pipes]
+    parts += [POWER_UP_STATE.pack(x, prev_x, y, POWER_UP_TYPES.index(power_type), animation)
+              for x, prev_x, y, power_type, animation in state.power_ups]
+    parts.append(RNG_STATE.pack(version, *internal, gauss_next is not None, gauss_next or 0.0))
+    return b''.join(parts)
+
+
+def unpack_state(data):
+    """Inverse of pack_state"""
+    bird = BIRD_STATE.unpack_from(data, 0)
+    offset = BIRD_STATE.size
+    score, game_over, death_cause, next_pipe, spawn_timer, num_pipes, num_power_ups = GAME_STATE.unpack_from(data, offset)
+    offset += GAME_STATE.size
+
+    pipes = []
+    for _ in range(num_pipes):
+        pipes.append(PIPE_STATE.unpack_from(data, offset))
+        offset += PIPE_STATE.size
+    power_ups = []
+    for _ in range(num_power_ups):
+        x, prev_x, y, power_type, animation = POWER_UP_STATE.unpack_from(data, offset)
+        power_ups.append((x, prev_x, y, POWER_UP_TYPES[power_type], animation))
+        offset += POWER_UP_STATE.size
+
+    rng = RNG_STATE.unpack_from(data, offset)
+    rng_state = (rng[0], rng[1:626], rng[627] if rng[626] else None)
+    return GameState(bird, tuple(pipes), tuple(power_ups), score, game_over, DEATH_CAUSES[death_cause],
+                     next_pipe, spawn_timer, rng_state)
+
+
+class Replay:
+    """One recorded episode: its seed and the frames the bird jumped on.
+
+    Games are deterministic for a given seed, so this is all it takes to play
+    an episode again. Optional snapshots of the gameplay state, keyed by the
+    number of frames played before them, let seek() skip most of the way.
+    """
+
+    def __init__(self, seed, jumps=(), length=0, score=0, snapshots=None):
+        self.seed = seed
+        self.jumps = list(jumps)
+        self.length = length
+        self.score = score
+        self.snapshots = snapshots or {}
+
+    def to_bytes(self):
+        out = bytearray(HEADER.pack(MAGIC, VERSION, self.seed, self.length, self.score,
+                                    len(self.jumps), len(self.snapshots)))
+        # Jump frames as gaps from the previous jump, one or two bytes each
+        previous = 0
+        for frame in self.jumps:
+            _write_varint(out, frame - previous)
+            previous = frame
+        for frame in sorted(self.snapshots):
+            payload = pack_state(self.snapshots[frame])
+            out += SNAPSHOT_HEADER.pack(frame, len(payload))
+            out += payload
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, seed, length, score, num_jumps, num_snapshots = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError("not a replay file")
+        if version != VERSION:
+            raise ValueError(f"unsupported replay version {version}")
+
+        offset = HEADER.size
+        jumps = []
+        frame = 0
+        for _ in range(num_jumps):
+            gap, offset = _read_varint(data, offset)
+            frame += gap
+            jumps.append(frame)
+
+        snapshots = {}
+        for _ in range(num_snapshots):
+            frame, size = SNAPSHOT_HEADER.unpack_from(data, offset)
+            offset += SNAPSHOT_HEADER.size
+            snapshots[frame] = unpack_state(data[offset:offset + size])
+            offset += size
+        return cls(seed, jumps, length, score, snapshots)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+
+class ReplayRecorder:
+    """Wraps Game.step and records every jump, plus a snapshot every snapshot_every frames"""
+
+    def __init__(self, game, snapshot_every=None):
+        self.game = game
+        self.snapshot_every = snapshot_every
+        self.replay = None
+
+    def reset(self, seed=None):
+        if self.game.level is not None:
+            raise ValueError("replays only store the game's seed, games playing a level cannot be recorded")
+        # A replay needs a seed to play back, so pick one if none was given
+        if seed is None:
+            seed = random.getrandbits(63)
+        # Checked now, a bad seed would only fail when the replay is saved
+        if not isinstance(seed, int) or not 0 <= seed < 2 ** 64:
+            raise ValueError(f"replays store seeds as unsigned 64-bit integers, cannot record seed {seed!r}")
+        self.replay = Replay(seed)
+        return self.game.reset(seed)
+
+    def step(self, action):
+        replay = self.replay
+        if self.snapshot_every and replay.length and replay.length % self.snapshot_every == 0:
+            replay.snapshots[replay.length] = self.game.snapshot()
+        if action:
+            replay.jumps.append(replay.length)
+        obs, reward, done = self.game.step(action)
+        replay.length += 1
+        replay.score = self.game.score
+        return obs, reward, done
+
+
+def _play_frames(replay, game, start, end, before_frame=None):
+    jumps = replay.jumps
+    i = bisect_left(jumps, start)
+    for frame in range(start, end):
+        if before_frame is not None:
+            before_frame(frame)
+        jump = i < len(jumps) and jumps[i] == frame
+        if jump:
+            i += 1
+        game.step(jump)
+
+
+def seek(replay, frame, game=None):
+    """Put game into its state after frame frames of the replay, starting from the nearest snapshot"""
+    if game is None:
+        game = Game(headless=True)
+    game.reset(replay.seed)
+    start = max((f for f in replay.snapshots if f <= frame), default=0)
+    if start:
+        game.restore(replay.snapshots[start])
+    _play_frames(replay, game, start, frame)
+    return game
+
+
+def play(replay, game=None, start=0, end=None):
+    """Play frames [start, end) of a replay, by default all of them headless.
+
+    Returns the game, left in the state after the last frame played.
+    """
+    end = replay.length if end is None else min(end, replay.length)
+    game = seek(replay, start, game)
+    _play_frames(replay, game, start, end)
+    return game
+
+
+def render(replay, out_dir, start=0, end=None, every=1):
+    """Save frames [start, end) of a replay as PNG images, drawn offscreen.
+
+    Offscreen games never open a window, so this works without a display.
+
+    Returns the paths written. Frames before start are skipped by seeking, so
+    effects such as clouds and particles only match a full playback from 0.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    end = replay.length if end is None else min(end, replay.length)
+    game = seek(replay, start, Game(offscreen=True))
+
+    paths = []
+
+    def save_frame(frame):
+        if (frame - start) % every == 0:
+            game.draw()
+            path = os.path.join(out_dir, f"frame_{frame:06d}.png")
+            pygame.image.save(game.screen, path)
+            paths.append(path)
+
+    _play_frames(replay, game, start, end, save_frame)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play back or render a recorded episode")
+    parser.add_argument('replay', help="replay file")
+    parser.add_argument('--render', metavar='DIR', help="save frames as PNG images to this directory")
+    parser.add_argument('--start', type=int, default=0, help="first frame")
+    parser.add_argument('--end', type=int, default=None, help="frame to stop before")
+    parser.add_argument('--every', type=int, default=1, help="save every n-th frame only")
+    args = parser.parse_args()
+
+    replay = Replay.load(args.replay)
+    print(f"seed {replay.seed}, {replay.length} frames, {len(replay.jumps)} jumps, "
+          f"{len(replay.snapshots)} snapshots, score {replay.score}")
+    if args.render:
+        paths = render(replay, args.render, args.start, args.end, args.every)
+        print(f"Wrote {len(paths)} frames to {args.render}")
+    else:
+        game = play(replay, start=args.start, end=args.end)
+        print(f"Played back to frame {args.end or replay.length}: score {game.score}, "
+              f"{'game over (' + game.death_cause + ')' if game.game_over else 'still playing'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import argparse
+import multiprocessing
+import os
+import time
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from flappy_bird import Game, OBS_SIZE
+from scores import open_score_store
+
+EpisodeResult = namedtuple('EpisodeResult', ['seed', 'score', 'length', 'death_cause'])
+
+FLOAT_SIZE = 4
+
+# Per-process state, set up once by _init_worker
+_worker = {}
+
+
+def gap_policy(obs):
+    """Simple baseline: flap when falling below the middle of the next gap"""
+    gap_center = (obs[3] + obs[4]) / 2
+    return obs[1] > 0 and obs[0] > gap_center
+
+
+def _init_worker(shm_name, slot_counter, workers):
+    with slot_counter.get_lock():
+        slot = slot_counter.value
+        slot_counter.value += 1
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    obs_offset = slot * OBS_SIZE * FLOAT_SIZE
+    _worker['shm'] = shm
+    _worker['slot'] = slot
+    _worker['obs'] = shm.buf[obs_offset:obs_offset + OBS_SIZE * FLOAT_SIZE].cast('f')
+    _worker['actions'] = shm.buf[_actions_offset(workers):]
+
+
+def _actions_offset(workers):
+    return workers * OBS_SIZE * FLOAT_SIZE
+
+
+def _run_chunk(policy, seeds, max_steps, record_dir=None):
+    obs_view = _worker['obs']
+    actions = _worker['actions']
+    slot = _worker['slot']
+    game = _worker.get('game')
+    if game is None:
+        game = _worker['game'] = Game(headless=True, obs_buffer=obs_view)
+    # Recording goes through the same reset/step calls, wrapped
+    if record_dir is None:
+        env = game
+    else:
+        from replay import ReplayRecorder
+        env = ReplayRecorder(game)
+
+    results = []
+    for seed in seeds:
+        obs = env.reset(seed)
+        length = 0
+        done = False
+        while not done and length < max_steps:
+            actions[slot] = 1 if policy(obs) else 0
+            obs, reward, done = env.step(actions[slot])
+            length += 1
+        cause = game.death_cause if done else 'timeout'
+        results.append(EpisodeResult(seed, game.score, length, cause))
+        if record_dir is not None:
+            env.replay.save(os.path.join(record_dir, f"{seed}.fbr"))
+    return results
+
+
+class RolloutRunner:
+    """Plays headless episodes on a pool of worker processes.
+
+    Each worker owns one slot of a shared memory block holding its current
+    observation and last action, so the parent can watch live episodes without
+    any message passing. Episode i always runs with seed base_seed + i, so
+    results do not depend on how episodes are spread over workers. With a
+    record_dir every episode is also saved there as a replay named <seed>.fbr.
+    Results can be logged to a ScoreStore under an agent name; only this
+    process writes to it, so workers never contend for the file.
+    """
+
+    def __init__(self, policy=gap_policy, workers=None, max_steps=100000, record_dir=None,
+                 score_store=None, agent='agent'):
+        self.policy = policy
+        self.score_store = score_store
+        self.agent = agent
+        self.workers = workers or os.cpu_count() or 1
+        self.max_steps = max_steps
+        self.record_dir = record_dir
+        if record_dir is not None:
+            os.makedirs(record_dir, exist_ok=True)
+
+        size = _actions_offset(self.workers) + self.workers
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self.observations = self.shm.buf[:_actions_offset(self.workers)].cast('f')
+        self.actions = self.shm.buf[_actions_offset(self.workers):]
+
+        slot_counter = multiprocessing.Value('i', 0)
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.shm.name, slot_counter, self.workers),
+        )
+
+    def observation(self, slot):
+        """Copy of the latest observation published by the worker in the given slot"""
+        return self.observations[slot * OBS_SIZE:(slot + 1) * OBS_SIZE].tolist()
+
+    def run(self, episodes, base_seed=0, chunk_size=None):
+        """Play the given number of episodes, returns EpisodeResults in seed order"""
+        if chunk_size is None:
+            chunk_size = max(1, episodes // (self.workers * 8))
+        seeds = range(base_seed, base_seed + episodes)
+        chunks = [seeds[i:i + chunk_size] for i in range(0, episodes, chunk_size)]
+
+        futures = [self.executor.submit(_run_chunk, self.policy, chunk, self.max_steps, self.record_dir)
+                   for chunk in chunks]
+        results = []
+        for future in futures:
+            results.extend(future.result())
+        if self.score_store is not None:
+            self.score_store.add_many((r.score, self.agent, r.seed, r.length) for r in results)
+        return results
+
+    def close(self):
+        self.executor.shutdown()
+        try:
+            self.observations.release()
+            self.actions.release()
+            self.shm.close()
+        finally:
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play headless episodes across all cores")
+    parser.add_argument('--episodes', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-steps', type=int, default=100000)
+    parser.add_argument('--record-dir', help="save a replay of every episode to this directory")
+    parser.add_argument('--scores', help="log results to this score store (.db for SQLite)")
+    parser.add_argument('--agent', default='gap_policy', help="agent name for the score store")
+    args = parser.parse_args()
+
+    store = open_score_store(args.scores) if args.scores else None
+    with RolloutRunner(workers=args.workers, max_steps=args.max_steps, record_dir=args.record_dir,
+                       score_store=store, agent=args.agent) as runner:
+        start = time.perf_counter()
+        results = runner.run(args.episodes, base_seed=args.seed)
+        elapsed = time.perf_counter() - start
+
+    steps = sum(r.length for r in results)
+    print(f"{len(results)} episodes on {runner.workers} workers in {elapsed:.2f}s "
+          f"({steps / elapsed:.0f} steps/s)")
+    print(f"Mean score: {sum(r.score for r in results) / len(results):.2f}, "
+          f"best: {max(r.score for r in results)}")
+    print(f"Death causes: {dict(Counter(r.death_cause for r in results))}")
+    if store is not None:
+        print(f"Leaderboard: {store.leaderboard(k=5)}")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+import heapq
+import json
+import os
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import namedtuple
+
+ScoreRecord = namedtuple('ScoreRecord', ['agent', 'seed', 'score', 'length', 'time'])
+
+# Written by the game for human players
+PLAYER = 'player'
+
+_STOP = object()
+# Queued by flush(), ends the batch being collected
+_FLUSH = object()
+
+
+class ScoreStore:
+    """Finished games, persisted by a background thread in batches.
+
+    add() only queues the record and never touches the disk, so a game over
+    frame cannot stall on I/O. From the first queued record the writer thread
+    keeps collecting until batch_size records are queued or flush_interval
+    seconds have passed, whichever comes first, and writes them in one batch.
+    flush() and close() write the pending batch straight away. A failed write
+    is not swallowed: the error is raised from the next flush() or close().
+
+    Subclasses implement _write(records) and the queries.
+    """
+
+    def __init__(self, batch_size=512, flush_interval=1.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.error = None
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._writer, name=f"{type(self).__name__} writer", daemon=True)
+        self.thread.start()
+
+    def add(self, score, agent=PLAYER, seed=None, length=None):
+        """Queue a finished game, returns its ScoreRecord"""
+        record = ScoreRecord(agent, seed, score, length, time.time())
+        self._added(record)
+        self.queue.put(record)
+        return record
+
+    def add_many(self, records):
+        """Queue several (score, agent, seed, length) tuples at once"""
+        now = time.time()
+        for score, agent, seed, length in records:
+            record = ScoreRecord(agent, seed, score, length, now)
+            self._added(record)
+            self.queue.put(record)
+
+    def _added(self, record):
+        """Hook for stores that keep an in-memory view, called before the record is queued"""
+
+    def flush(self):
+        """Block until everything queued so far is written"""
+        # After close() the writer is gone, and it wrote everything before stopping
+        if self.thread.is_alive():
+            self.queue.put(_FLUSH)
+            self.queue.join()
+        self._raise_error()
+
+    def close(self):
+        """Write everything still queued and stop the writer thread"""
+        if self.thread.is_alive():
+            self.queue.put(_STOP)
+            self.thread.join()
+        # The writer released its own resources, these are the caller's
+        self._close()
+        self._raise_error()
+
+    def _raise_error(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def _writer(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and batch[-1] is not _FLUSH and batch[-1] is not _STOP:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            stop = batch[-1] is _STOP
+            records = [record for record in batch if record is not _FLUSH and record is not _STOP]
+            try:
+                if records:
+                    self._write(records)
+            except Exception as e:
+                self.error = e
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+            if stop:
+                self._close()
+                return
+
+    def _write(self, records):
+        raise NotImplementedError
+
+    def _close(self):
+        """Release the calling thread's backend resources"""
+
+    def best(self, agent=None, seed=None):
+        """Highest score, optionally for one agent and/or seed, 0 if there is none"""
+        top = self.top(1, agent, seed)
+        return top[0].score if top else 0
+
+    def top(self, k=10, agent=None, seed=None):
+        """The k best ScoreRecords, optionally for one agent and/or seed"""
+        raise NotImplementedError
+
+    def leaderboard(self, by='agent', k=10, agent=None):
+        """Best score and game count per agent or per seed, as (key, best, games), best first"""
+        raise NotImplementedError
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LogScoreStore(ScoreStore):
+    """Append-only JSON lines file, all records also kept in memory for queries.
+
+    Several processes may append to one log, so loading never rewrites it. A
+    line holding a single integer, the old highscore.txt format, is read as a
+    player record. Lines that cannot be read, such as a last line torn by a
+    crash or still being written by another process, are skipped; if the file
+    does not end with a newline the next append starts a fresh line.
+
+    compact() rewrites the whole log from this process's records, so it is
+    only allowed for a store opened with exclusive=True, meaning no other
+    process writes to the log.
+    """
+
+    def __init__(self, path, exclusive=False, **kwargs):
+        self.path = path
+        self.exclusive = exclusive
+        self.records, self.torn = self._load()
+        super().__init__(**kwargs)
+
+    def _load(self):
+        """Records in the log and whether it ends without a newline"""
+        try:
+            with open(self.path, 'r') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return [], False
+
+        records = []
+        for line in data.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            if line.lstrip('-').isdigit():
+                records.append(ScoreRecord(PLAYER, None, int(line), None, None))
+                continue
+            try:
+                records.append(ScoreRecord(**json.loads(line)))
+            except (ValueError, TypeError):
+                continue
+        return records, bool(data) and not data.endswith('\n')
+
+    def compact(self):
+        """Rewrite the whole log from the records in memory with an atomic replace"""
+        if not self.exclusive:
+            raise RuntimeError("compact() rewrites the shared log, open the store with exclusive=True")
+        self.flush()
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.scores-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.writelines(json.dumps(record._asdict()) + '\n' for record in self.records)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self.torn = False
+
+    def _added(self, record):
+        self.records.append(record)
+
+    def _write(self, records):
+        # One write call per batch, so concurrent appenders do not interleave lines
+        data = ''.join(json.dumps(record._asdict()) + '\n' for record in records)
+        if self.torn:
+            # Keep the first record off the unterminated last line
+            data = '\n' + data
+            self.torn = False
+        with open(self.path, 'a') as f:
+            f.write(data)
+
+    def _select(self, agent, seed):
+        return [record for record in self.records
+                if (agent is None or record.agent == agent) and (seed is None or record.seed == seed)]
+
+    def top(self, k=10, agent=None, seed=None):
+        return heapq.nlargest(k, self._select(agent, seed), key=lambda record: record.score)
+
+    def leaderboard(self, by='agent', k=10, agent=None):
+        if by not in ScoreRecord._fields:
+            raise ValueError(f"cannot rank by {by!r}")
+        boards = {}
+        for record in self._select(agent, None):
+            key = getattr(record, by)
+            best, games = boards.get(key, (0, 0))
+            boards[key] = (max(best, record.score), games + 1)
+        return heapq.nlargest(k, ((key, best, games) for key, (best, games) in boards.items()),
+                              key=lambda row: row[1])
+
+
+class SQLiteScoreStore(ScoreStore):
+    """SQLite database, each batch is inserted in one transaction.
+
+    Queries see everything added before them: they flush pending writes first.
+    """
+
+    def __init__(self, path, **kwargs):
+        self.path = path
+        self.local = threading.local()
+        with self._connect() as db:
+            db.execute('CREATE TABLE IF NOT EXISTS scores '
+                       '(agent TEXT NOT NULL, seed INTEGER, score INTEGER NOT NULL, length INTEGER, time REAL)')
+            db.execute('CREATE INDEX IF NOT EXISTS scores_by_agent ON scores (agent, seed, score)')
+            db.execute('CREATE INDEX IF NOT EXISTS scores_by_score ON scores (score)')
+        super().__init__(**kwargs)
+
+    def _connect(self):
+        # Connections cannot be shared between threads, each thread opens its own
+        db = getattr(self.local, 'db', None)
+        if db is None:
+            db = self.local.db = sqlite3.connect(self.path, timeout=30)
+            db.execute('PRAGMA journal_mode=WAL')
+        return db
+
+    def _write(self, records):
+        with self._connect() as db:
+            db.executemany('INSERT INTO scores (agent, seed, score, length, time) VALUES (?, ?, ?, ?, ?)', records)
+
+    def _close(self):
+        db = getattr(self.local, 'db', None)
+        if db is not None:
+            db.close()
+            self.local.db = None
+
+    def _where(self, agent, seed):
+        conditions = []
+        params = []
+        if agent is not None:
+            conditions.append('agent = ?')
+            params.append(agent)
+        if seed is not None:
+            conditions.append('seed = ?')
+            params.append(seed)
+        return (' WHERE ' + ' AND '.join(conditions) if conditions else ''), params
+
+    def top(self, k=10, agent=None, seed=None):
+        self.flush()
+        where, params = self._where(agent, seed)
+        rows = self._connect().execute(
+            f'SELECT agent, seed, score, length, time FROM scores{where} ORDER BY score DESC LIMIT ?',
+            params + [k])
+        return [ScoreRecord(*row) for row in rows]
+
+    def leaderboard(self, by='agent', k=10, agent=None):
+        if by not in ScoreRecord._fields:
+            raise ValueError(f"cannot rank by {by!r}")
+        self.flush()
+        where, params = self._where(agent, None)
+        rows = self._connect().execute(
+            f'SELECT {by}, MAX(score), COUNT(*) FROM scores{where} GROUP BY {by} ORDER BY MAX(score) DESC LIMIT ?',
+            params + [k])
+        return [tuple(row) for row in rows]
+
+
+def open_score_store(path, **kwargs):
+    """SQLite for .db/.sqlite paths, an append-only log otherwise"""
+    if os.path.splitext(path)[1] in ('.db', '.sqlite', '.sqlite3'):
+        return SQLiteScoreStore(path, **kwargs)
+    return LogScoreStore(path, **kwargs)
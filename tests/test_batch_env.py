@@ -0,0 +1,50 @@
+import pytest
+
+from batch_env import BatchEnv
+from flappy_bird import SCREEN_WIDTH, Game
+
+# Far enough below the spawn threshold that no power-up appears in a test game
+NO_POWER_UPS = -10 ** 9
+
+
+def copy_new_pipe(env, game):
+    """Give the pipe BatchEnv just spawned the gap of the one Game spawned with its own RNG"""
+    pipe = game.pipes[-1]
+    assert env.last_pipe_x[0] == pipe.x == SCREEN_WIDTH
+    slot = ((env.pipe_x[0] == SCREEN_WIDTH) & env.pipe_active[0]).argmax()
+    env.pipe_top[0, slot] = pipe.top_height
+    env.pipe_bottom[0, slot] = pipe.bottom_y
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_batch_env_matches_game_without_power_ups(seed):
+    game = Game(headless=True)
+    game.reset(seed)
+    game.power_up_spawn_timer = NO_POWER_UPS
+    env = BatchEnv(1, seed)
+    env.power_up_spawn_timer[:] = NO_POWER_UPS
+    for i, pipe in enumerate(game.pipes):
+        env.pipe_top[0, i] = pipe.top_height
+        env.pipe_bottom[0, i] = pipe.bottom_y
+
+    for tick in range(5000):
+        # Hop towards the middle of the next gap, with a few misjudged ticks to end the game
+        pipe = game.pipes[game.next_pipe]
+        action = game.bird.y > pipe.top_height + 100 + (tick // 300) * 40 and game.bird.velocity > -2
+        _, reward, done = game.step(action)
+        rewards, dones = env.step([action])
+        if game.pipes[-1].x == SCREEN_WIDTH:
+            copy_new_pipe(env, game)
+
+        assert rewards[0] == reward
+        assert dones[0] == done
+        if done:
+            assert env.episode_scores[0] == game.score
+            assert env.episode_lengths[0] == tick + 1
+            break
+        assert env.bird_y[0] == game.bird.y
+        assert env.bird_velocity[0] == game.bird.velocity
+        assert env.score[0] == game.score
+        assert sorted(env.pipe_x[0][env.pipe_active[0]].tolist()) == [pipe.x for pipe in game.pipes]
+    else:
+        pytest.fail("the game never ended")
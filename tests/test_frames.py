@@ -0,0 +1,53 @@
+import numpy as np
+import pygame
+import pytest
+
+from frames import FrameCapture
+
+CONFIGS = [
+    {},
+    {'size': (84, 84)},
+    {'grayscale': True},
+    {'size': (84, 84), 'grayscale': True},
+    {'stack': 3},
+    {'size': (84, 84), 'grayscale': True, 'stack': 4},
+]
+
+
+def reference(capture):
+    """The frame FrameCapture should produce, built with plain copying pygame calls"""
+    source = capture.game.screen
+    if capture.size is not None:
+        source = pygame.transform.smoothscale(source, capture.size)
+    if capture.grayscale:
+        return pygame.surfarray.array3d(pygame.transform.grayscale(source))[..., 0].T
+    return pygame.surfarray.array3d(source).transpose(1, 0, 2)
+
+
+@pytest.mark.parametrize('config', CONFIGS)
+def test_reset_and_step_keep_working_while_observations_are_held(config):
+    capture = FrameCapture(**config)
+    stack = config.get('stack', 1)
+    obs = capture.reset(0)
+    history = [reference(capture)] * stack
+    held = [obs]
+    for tick in range(60):
+        obs, reward, done = capture.step(tick % 20 == 0)
+        held.append(obs)
+        history.append(reference(capture))
+        if stack > 1:
+            assert obs.shape == (stack,) + capture.shape
+            for i in range(stack):
+                np.testing.assert_array_equal(obs[i], history[i - stack])
+        else:
+            assert obs.shape == capture.shape
+            np.testing.assert_array_equal(obs, history[-1])
+        if done:
+            break
+    assert obs.dtype == np.uint8
+
+
+def test_headless_game_is_rejected():
+    from flappy_bird import Game
+    with pytest.raises(ValueError):
+        FrameCapture(Game(headless=True))
@@ -0,0 +1,32 @@
+import os
+import subprocess
+import sys
+
+from flappy_bird import Game
+from inference import BatchedPolicy, BridgeController, PolicyBridge
+from rollout import gap_policy
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_imports_leave_the_video_driver_alone():
+    # A fresh interpreter, this one may have imported pygame with any driver already
+    env = {key: value for key, value in os.environ.items() if not key.startswith('SDL_')}
+    code = ("import os, inference, frames, replay, rollout, pygame; "
+            "print(os.environ.get('SDL_VIDEODRIVER'), os.environ.get('SDL_AUDIODRIVER'), pygame.display.get_init())")
+    out = subprocess.run([sys.executable, '-c', code], cwd=REPO, env=env, capture_output=True, text=True, check=True)
+    assert out.stdout.split() == ['None', 'None', 'False']
+
+
+def test_bridged_steps_report_policy_latency():
+    with PolicyBridge(BatchedPolicy(gap_policy), latency_budget=1.0) as bridge:
+        controller = BridgeController(bridge)
+        game = Game(headless=True)
+        game.reset(0)
+        for _ in range(50):
+            obs, reward, done, latency = controller.step(game)
+            assert latency is not None and 0 <= latency < 1.0
+            if done:
+                break
+    assert controller.misses == 0
+    assert controller.stats()['samples'] == controller.tick
@@ -0,0 +1,41 @@
+import pytest
+
+from flappy_bird import Game
+from replay import Replay, ReplayRecorder, play, seek
+from rollout import gap_policy
+
+
+def record(seed, snapshot_every=50):
+    recorder = ReplayRecorder(Game(headless=True), snapshot_every)
+    obs = recorder.reset(seed)
+    states = [recorder.game.snapshot()]
+    done = False
+    while not done and recorder.replay.length < 2000:
+        obs, reward, done = recorder.step(gap_policy(obs))
+        states.append(recorder.game.snapshot())
+    return recorder.replay, states
+
+
+def test_replay_survives_a_round_trip_through_bytes():
+    replay, states = record(3)
+    assert replay.snapshots
+    loaded = Replay.from_bytes(replay.to_bytes())
+    assert (loaded.seed, loaded.jumps, loaded.length, loaded.score) == \
+        (replay.seed, replay.jumps, replay.length, replay.score)
+    assert loaded.snapshots == replay.snapshots
+    assert play(loaded).snapshot() == states[-1]
+
+
+def test_seek_through_a_snapshot_matches_straight_playback():
+    replay, states = record(7)
+    for frame in (0, 49, 50, 51, 120, replay.length):
+        assert seek(replay, frame).snapshot() == states[frame]
+    # Without snapshots seek plays every frame from the start
+    bare = Replay(replay.seed, replay.jumps, replay.length, replay.score)
+    assert seek(bare, 120).snapshot() == states[120]
+
+
+@pytest.mark.parametrize('seed', [-1, 2 ** 64, 'abc'])
+def test_seeds_a_replay_cannot_store_are_rejected_up_front(seed):
+    with pytest.raises(ValueError):
+        ReplayRecorder(Game(headless=True)).reset(seed)
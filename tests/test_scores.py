@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from scores import PLAYER, LogScoreStore, SQLiteScoreStore, open_score_store
+
+BACKENDS = ['scores.log', 'scores.db']
+
+
+@pytest.mark.parametrize('name', BACKENDS)
+def test_added_records_are_queried_after_flush(tmp_path, name):
+    with open_score_store(str(tmp_path / name)) as store:
+        store.add(3, 'a', seed=1, length=10)
+        store.add_many([(7, 'b', 2, 20), (5, 'a', 3, 30)])
+        store.flush()
+        assert [r.score for r in store.top()] == [7, 5, 3]
+        assert store.best('a') == 5
+        assert store.leaderboard() == [('b', 7, 1), ('a', 5, 2)]
+        with pytest.raises(ValueError):
+            store.leaderboard(by='nope')
+
+    # Everything written survives reopening
+    with open_score_store(str(tmp_path / name)) as store:
+        assert store.best() == 7
+
+
+@pytest.mark.parametrize('name', BACKENDS)
+def test_queries_after_close_do_not_hang(tmp_path, name):
+    store = open_score_store(str(tmp_path / name))
+    store.add(4, 'a')
+    store.close()
+    store.flush()
+    assert store.best() == 4
+    assert store.leaderboard(k=1) == [('a', 4, 1)]
+
+
+def test_old_single_integer_file_is_read_as_a_player_record(tmp_path):
+    path = tmp_path / 'highscore.txt'
+    path.write_text('42')
+    with LogScoreStore(str(path)) as store:
+        assert store.best(PLAYER) == 42
+        store.add(12, PLAYER)
+    with LogScoreStore(str(path)) as store:
+        assert sorted(r.score for r in store.records) == [12, 42]
+
+
+def test_torn_and_damaged_lines_are_skipped(tmp_path):
+    path = tmp_path / 'scores.log'
+    good = json.dumps({'agent': 'a', 'seed': 1, 'score': 5, 'length': 3, 'time': 1.0})
+    data = '{"bad\n' + good + '\n{"agent": "a", "se'
+    path.write_text(data)
+    with LogScoreStore(str(path)) as store:
+        assert [r.score for r in store.records] == [5]
+        store.add(9, 'b')
+    # Loading left the file alone, the append went on a line of its own
+    assert path.read_text().startswith(data + '\n')
+    with LogScoreStore(str(path)) as store:
+        assert sorted(r.score for r in store.records) == [5, 9]
+
+
+def test_compact_needs_an_exclusive_store(tmp_path):
+    path = tmp_path / 'scores.log'
+    path.write_text('{"bad\n')
+    with LogScoreStore(str(path)) as store:
+        with pytest.raises(RuntimeError):
+            store.compact()
+    with LogScoreStore(str(path), exclusive=True) as store:
+        store.add(6, 'a')
+        store.compact()
+    assert [json.loads(line)['score'] for line in path.read_text().splitlines()] == [6]
+
+
+def test_sqlite_store_is_chosen_by_extension(tmp_path):
+    with open_score_store(str(tmp_path / 'scores.db')) as store:
+        assert isinstance(store, SQLiteScoreStore)
@@ -0,0 +1,55 @@
+import pytest
+
+from flappy_bird import Game
+from level import LevelGenerator
+from rollout import gap_policy
+
+
+def make_game(level_seed):
+    level = None if level_seed is None else LevelGenerator(level_seed)
+    return Game(headless=True, level=level)
+
+
+def play(game, ticks):
+    """Step the game with gap_policy, returns the GameState after every tick"""
+    states = []
+    obs = game.observation
+    for _ in range(ticks):
+        obs, reward, done = game.step(gap_policy(obs))
+        states.append(game.snapshot())
+    return states
+
+
+@pytest.mark.parametrize('level_seed', [None, 2])
+def test_restore_mid_episode_into_another_game_continues_it_exactly(level_seed):
+    game = make_game(level_seed)
+    game.reset(11)
+    play(game, 150)
+    state = game.snapshot()
+    expected = play(game, 300)
+
+    other = make_game(level_seed)
+    other.reset(99)
+    other.restore(state)
+    assert other.snapshot() == state
+    assert play(other, 300) == expected
+
+
+@pytest.mark.parametrize('level_seed', [None, 2])
+def test_simulate_from_a_restored_state_matches_stepping(level_seed):
+    game = make_game(level_seed)
+    game.reset(5)
+    play(game, 100)
+    state = game.snapshot()
+    actions = [tick % 17 == 0 for tick in range(200)]
+
+    score = game.score
+    for action in actions:
+        game.step(action)
+    stepped = game.snapshot()
+
+    game.restore(state)
+    reward, done = game.simulate(actions)
+    assert game.snapshot() == stepped
+    assert reward == stepped.score - score
+    assert done == stepped.game_over